@@ -1,40 +1,111 @@
 from __future__ import annotations
 from typing import List, Dict
+from collections import Counter
+import asyncio
+import json
 import random
+from functools import lru_cache
+from sqlalchemy import select
 from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
 
+from . import ask_parser, deadline
+from .cache import PersistentCache, make_key, register_stats
+from .catalog import CATALOG
+from .itinerary import plan_days
 from .config import settings
-from .utils import daterange, to_price_tier, interest_match, mobility_ok
-from .retrieval import fetch_local_events, fetch_osm_pois, fetch_osm_restaurants
-from .weather import geocode_city, daily_weather, summarize_weather, packing_list
+from .db import AsyncSessionLocal, insert_ignore
+from .metrics import timed
+from .utils import daterange, to_price_tier, interest_match, mobility_ok, normalize
+from .retrieval import afetch_local_events, afetch_osm_pois, afetch_osm_restaurants, afetch_osm_places
+from . import weather_store
+from .weather import ageocode_city, adaily_weather, summarize_weather, packing_list
 
 LLM_MODEL = "gpt-4o-mini"
 
-def parse_free_text(ask: str) -> Dict:
-    if not ask or not settings.openai_api_key:
-        return {}
-    import json
-    try:
-        llm = ChatOpenAI(model=LLM_MODEL, temperature=0, openai_api_key=settings.openai_api_key, timeout=10)
-        sys = SystemMessage(content="""Extract structured trip preferences as JSON with keys:
+FALLBACKS = register_stats("fallback", Counter(osm_pois=0, osm_restaurants=0))  # DB had nothing nearby
+
+PARSE_PROMPT = """Extract structured trip preferences as JSON with keys:
 budget_tier one of ["$","$$","$$$"], interests array of strings,
 mobility nullable string (e.g., "wheelchair","no-long-hikes","stroller"),
-dietary nullable string (e.g., "vegan","halal","gluten-free"). Only return valid JSON.""")
-        out = llm.invoke([sys, HumanMessage(content=ask)]).content
-        return json.loads(out)
+dietary nullable string (e.g., "vegan","halal","gluten-free"). Only return valid JSON."""
+
+def _parse_messages(ask: str):
+    return [SystemMessage(content=PARSE_PROMPT), HumanMessage(content=ask)]
+
+LLM_TIMEOUT_S = 10
+
+@lru_cache(maxsize=1)
+def _llm() -> ChatOpenAI:
+    """One client (and HTTP connection pool) for the life of the process."""
+    return ChatOpenAI(model=LLM_MODEL, temperature=0, openai_api_key=settings.openai_api_key,
+                      base_url=settings.openai_base_url, timeout=LLM_TIMEOUT_S)
+
+_PARSE_CACHE = PersistentCache("llm_parse", settings.llm_parse_cache_ttl_s)
+
+def _parse_key(ask: str) -> str:
+    return make_key(LLM_MODEL, PARSE_PROMPT, normalize(ask))
+
+@timed("llm")
+async def _allm_parse(ask: str) -> Dict:
+    try:
+        return json.loads((await _llm().ainvoke(_parse_messages(ask))).content)
     except Exception:
         return {}
 
-def _load_pois_from_db(city: str, interests: List[str], mobility: str | None, price_tier: str, db_session):
-    from .models import POI
-    q = db_session.query(POI).filter(POI.city.ilike(f"%{city.split(',')[0]}%")).all()
+def _rules_first(ask: str):
+    """(rule-based prefs, whether the LLM is still needed)."""
+    rules, confident = ask_parser.extract(ask)
+    needs_llm = not confident and bool(settings.openai_api_key)
+    ask_parser.STATS["llm" if needs_llm else "rules"] += 1
+    return rules, needs_llm
+
+async def aparse_free_text(ask: str) -> Dict:
+    if not ask:
+        return {}
+    rules, needs_llm = _rules_first(ask)
+    if not needs_llm:
+        return rules
+    # out of time: the rules alone; the parse still lands in the cache for next time
+    llm = await deadline.bounded(_PARSE_CACHE.aget_or_fetch(_parse_key(ask), lambda: _allm_parse(ask)),
+                                 LLM_TIMEOUT_S, "ask", {})
+    return {**rules, **llm}
+
+def _has_geo(lat: float, lon: float) -> bool:
+    return (lat, lon) != (0.0, 0.0)
+
+# what _poi_cards / _restaurant_cards read; rows are fetched with these columns only
+_POI_COLUMNS = ("name", "address", "lat", "lon", "price_tier", "duration_minutes", "tags",
+                "wheelchair_friendly", "child_friendly")
+_RESTAURANT_COLUMNS = ("name", "address", "lat", "lon", "price_tier", "tags")
+
+@timed("db")
+async def _anearby_rows(model, city: str, lat: float, lon: float, db_session, columns, where=()):
+    if _has_geo(lat, lon):
+        return await model.anear(db_session, lat, lon, settings.max_radius_km, limit=settings.near_limit,
+                                 where=where, columns=columns)
+    q = select(*(getattr(model, c) for c in columns)).where(_city_like(model, city), *where).order_by(model.id)
+    return (await db_session.execute(q)).all()
+
+def _city_like(model, city: str):
+    return model.city.ilike(f"%{city.split(',')[0]}%")
+
+def _poi_criteria(interests: List[str], mobility: str | None):
+    """SQL twins of utils.interest_match / utils.mobility_ok."""
+    from .models import POI, PoiTag
+    where = []
+    wants = sorted({i.strip().lower() for i in interests or [] if i.strip()})
+    if wants:
+        where.append(POI.id.in_(select(PoiTag.poi_id).where(PoiTag.tag.in_(wants))))
+    if mobility == "wheelchair":
+        where.append(POI.wheelchair_friendly == 1)
+    elif mobility == "no-long-hikes":
+        where.append(POI.duration_minutes <= 120)
+    return where
+
+def _poi_cards(rows, price_tier: str) -> List[Dict]:
     cards = []
-    for p in q:
-        if not interest_match(p.tags, interests):
-            continue
-        if not mobility_ok(mobility, p.wheelchair_friendly, p.duration_minutes):
-            continue
+    for p in rows:
         cards.append({
             "title": p.name,
             "address": p.address,
@@ -47,11 +118,9 @@ def _load_pois_from_db(city: str, interests: List[str], mobility: str | None, pr
         })
     return cards
 
-def _load_restaurants_from_db(city: str, price_tier: str, db_session):
-    from .models import Restaurant
-    rs = db_session.query(Restaurant).filter(Restaurant.city.ilike(f"%{city.split(',')[0]}%")).all()
+def _restaurant_cards(rows, price_tier: str) -> List[Dict]:
     out = []
-    for r in rs:
+    for r in rows:
         tagset = {t.strip().lower() for t in (r.tags or "").split(",") if t.strip()}
         out.append({
             "title": r.name, "address": r.address, "geo": (r.lat, r.lon),
@@ -60,40 +129,70 @@ def _load_restaurants_from_db(city: str, price_tier: str, db_session):
         })
     return out
 
-def _cache_osm_into_db(city: str, pois: List[Dict], restaurants: List[Dict], db_session):
-    from .models import POI, Restaurant
-    existing_pois = { (p.name, p.city) for p in db_session.query(POI.name, POI.city).all() }
-    for p in pois:
-        key = (p["title"], city)
-        if key in existing_pois: 
-            continue
-        db_session.add(POI(
-            name=p["title"],
-            address=p.get("address",""),
-            lat=p["geo"][0], lon=p["geo"][1],
-            tags=",".join(p.get("tags", [])),
-            price_tier=p.get("price_tier","$$"),
-            duration_minutes=p.get("duration_minutes", 90),
-            wheelchair_friendly=1 if p.get("wheelchair_friendly") else 0,
-            child_friendly=1 if p.get("child_friendly") else 0,
-            city=city
-        ))
-    existing_rest = { (r.name, r.city) for r in db_session.query(Restaurant.name, Restaurant.city).all() }
-    for r in restaurants:
-        key = (r["title"], city)
-        if key in existing_rest:
-            continue
-        db_session.add(Restaurant(
-            name=r["title"], address=r.get("address",""),
-            lat=r["geo"][0], lon=r["geo"][1],
-            tags=",".join(r.get("tags",[])),
-            price_tier=r.get("price_tier","$$"),
-            city=city
-        ))
+# Cached places come from the in-memory catalog unless IN_MEMORY_CATALOG=0, which reads the tables per request
+async def _aload_pois(city: str, interests: List[str], mobility: str | None, price_tier: str | None, db_session, lat: float, lon: float):
+    from .models import POI
+    if settings.in_memory_catalog:
+        await _acatalog_fresh()
+        return CATALOG.pois(city, lat, lon, interests, mobility, price_tier)
+    rows = await _anearby_rows(POI, city, lat, lon, db_session, _POI_COLUMNS, where=_poi_criteria(interests, mobility))
+    return _poi_cards(rows, price_tier)
+
+async def _aload_restaurants(city: str, price_tier: str | None, db_session, lat: float, lon: float):
+    from .models import Restaurant
+    if settings.in_memory_catalog:
+        await _acatalog_fresh()
+        return CATALOG.restaurants(city, lat, lon, price_tier)
+    return _restaurant_cards(await _anearby_rows(Restaurant, city, lat, lon, db_session, _RESTAURANT_COLUMNS), price_tier)
+
+async def _acatalog_fresh() -> None:
+    if CATALOG.due():
+        await asyncio.to_thread(CATALOG.refresh_if_due)
+
+async def _acache_osm_into_db(city: str, pois: List[Dict], restaurants: List[Dict], db_session):
+    """`_store_osm` on an AsyncSession; the bulk helpers are sync-only, so run them via run_sync.
+
+    The catalog is refreshed even when nothing was new: this fill only ran because
+    the catalog had nothing here, so rows already in the table came from elsewhere.
+    """
+    await db_session.run_sync(lambda s: _store_osm(city, pois, restaurants, s))
+    if settings.in_memory_catalog:
+        await asyncio.to_thread(CATALOG.refresh)
+
+@timed("db")
+def _store_osm(city: str, pois: List[Dict], restaurants: List[Dict], db_session) -> bool:
+    """Bulk insert; rows already cached for (name, city) are skipped by the unique index. True if new rows were committed."""
+    from .models import POI, Restaurant, with_geocell, index_poi_tags, touch_cells
+    poi_rows = [with_geocell({
+        "name": p["title"],
+        "address": p.get("address",""),
+        "lat": p["geo"][0], "lon": p["geo"][1],
+        "tags": ",".join(p.get("tags", [])),
+        "price_tier": p.get("price_tier","$$"),
+        "duration_minutes": p.get("duration_minutes", 90),
+        "wheelchair_friendly": 1 if p.get("wheelchair_friendly") else 0,
+        "child_friendly": 1 if p.get("child_friendly") else 0,
+        "city": city,
+    }) for p in pois]
+    rest_rows = [with_geocell({
+        "name": r["title"], "address": r.get("address",""),
+        "lat": r["geo"][0], "lon": r["geo"][1],
+        "tags": ",".join(r.get("tags",[])),
+        "price_tier": r.get("price_tier","$$"),
+        "city": city,
+    }) for r in restaurants]
     try:
+        inserted = insert_ignore(db_session, POI.__table__, poi_rows)
+        if inserted:
+            index_poi_tags(db_session, city, [r["name"] for r in poi_rows])
+        inserted += insert_ignore(db_session, Restaurant.__table__, rest_rows)
+        if inserted:
+            touch_cells(db_session, [r["geocell"] for r in poi_rows + rest_rows])
         db_session.commit()
     except Exception:
         db_session.rollback()
+        return False
+    return inserted > 0
 
 def _soft_dietary_rank(items: List[Dict], dietary: str | None) -> List[Dict]:
     if not dietary:
@@ -104,31 +203,38 @@ def _soft_dietary_rank(items: List[Dict], dietary: str | None) -> List[Dict]:
         return (1 if dietary.lower() in tags else 0, -len(tags))
     return sorted(items, key=score, reverse=True)
 
-def pick_activities(city: str, interests: List[str], mobility: str | None, price_tier: str, db_session, lat: float, lon: float):
-    cards = _load_pois_from_db(city, interests, mobility, price_tier, db_session)
+def _filter_osm_pois(osm: List[Dict], interests: List[str], mobility: str | None, price_tier: str) -> List[Dict]:
+    cards = []
+    for p in osm:
+        if not interest_match(",".join(p.get("tags", [])), interests):
+            continue
+        if not mobility_ok(mobility, 1 if p.get("wheelchair_friendly") else 0, p.get("duration_minutes",90)):
+            continue
+        p["price_tier"] = price_tier
+        cards.append(p)
+    return cards
+
+def _price_osm_restaurants(osm: List[Dict], price_tier: str) -> List[Dict]:
+    for r in osm:
+        r["price_tier"] = r.get("price_tier","$$") or price_tier
+    return osm
+
+async def apick_activities(city: str, interests: List[str], mobility: str | None, price_tier: str, db_session, lat: float, lon: float):
+    cards = await _aload_pois(city, interests, mobility, price_tier, db_session, lat, lon)
     if not cards:
-        osm = fetch_osm_pois(lat, lon, settings.radius_km, settings.max_radius_km)
-        cards = []
-        for p in osm:
-            if not interest_match(",".join(p.get("tags", [])), interests):
-                continue
-            if not mobility_ok(mobility, 1 if p.get("wheelchair_friendly") else 0, p.get("duration_minutes",90)):
-                continue
-            p["price_tier"] = price_tier
-            cards.append(p)
-        _cache_osm_into_db(city, cards, [], db_session)
+        FALLBACKS["osm_pois"] += 1
+        osm = await afetch_osm_pois(lat, lon, settings.radius_km, settings.max_radius_km)
+        cards = _filter_osm_pois(osm, interests, mobility, price_tier)
+        await _acache_osm_into_db(city, cards, [], db_session)
     return cards
 
-def pick_restaurants(city: str, dietary: str | None, price_tier: str, db_session, lat: float, lon: float):
-    out = _load_restaurants_from_db(city, price_tier, db_session)
+async def apick_restaurants(city: str, dietary: str | None, price_tier: str, db_session, lat: float, lon: float):
+    out = await _aload_restaurants(city, price_tier, db_session, lat, lon)
     if not out:
-        osm = fetch_osm_restaurants(lat, lon, settings.radius_km, settings.max_radius_km)
-        out = []
-        for r in osm:
-            r["price_tier"] = r.get("price_tier","$$") or price_tier
-            out.append(r)
-        _cache_osm_into_db(city, [], out, db_session)
-    # soft dietary preference: rank matches first, keep others
+        FALLBACKS["osm_restaurants"] += 1
+        osm = await afetch_osm_restaurants(lat, lon, settings.radius_km, settings.max_radius_km)
+        out = _price_osm_restaurants(osm, price_tier)
+        await _acache_osm_into_db(city, [], out, db_session)
     out = _soft_dietary_rank(out, dietary)
     return out[: settings.max_restaurants]
 
@@ -155,22 +261,278 @@ def _restaurants_as_activities(restaurants: List[Dict]) -> List[Dict]:
         })
     return out
 
-def build_plan(booking, preferences, ask, db_session):
-    overrides = parse_free_text(ask) if ask else {}
+def _resolve_prefs(preferences, overrides: Dict):
     interests = overrides.get("interests") or preferences.interests
     mobility = overrides.get("mobility") or preferences.mobility
     dietary = overrides.get("dietary") or preferences.dietary
     price_tier = to_price_tier(overrides.get("budget_tier") or preferences.budget_tier)
+    return interests, mobility, dietary, price_tier
+
+_PLAN_CACHE = PersistentCache("plan", settings.plan_cache_ttl_s)
+
+def plan_key(booking, preferences, ask) -> str:
+    """Canonical hash of everything that shapes a plan (order/case/whitespace-insensitive)."""
+    return make_key(
+        normalize(booking.location), booking.start_date.isoformat(), booking.end_date.isoformat(),
+        sorted({normalize(i) for i in preferences.interests if i.strip()}),
+        normalize(preferences.mobility or ""), normalize(preferences.dietary or ""),
+        preferences.budget_tier, normalize(ask or ""),
+    )
 
-    lat, lon = geocode_city(booking.location)
-    weather = daily_weather(lat, lon, booking.start_date, booking.end_date)
-    weather_summary = summarize_weather(weather)
-    pack = packing_list(weather, mobility)
+@timed("db")
+async def _aarea_version(lat: float, lon: float, db_session=None) -> int:
+    """Version of the cached places a plan at (lat, lon) draws on; a short session of its own when `db_session` is None."""
+    from .models import aarea_version
+    if db_session is None:
+        async with AsyncSessionLocal() as s:
+            return await aarea_version(s, lat, lon, settings.max_radius_km)
+    version = await aarea_version(db_session, lat, lon, settings.max_radius_km)
+    await db_session.commit()  # end the read: the connection goes back to the pool for the build
+    return version
 
-    pois = pick_activities(booking.location, interests, mobility, price_tier, db_session, lat, lon)
-    restaurants = pick_restaurants(booking.location, dietary, price_tier, db_session, lat, lon)
+async def _aplan_cache_key(key: str, location: str, db_session=None) -> str:
+    with deadline.scope():  # a miss here is the build's to record (and its plan is not cached)
+        lat, lon = await ageocode_city(location)
+    return make_key(key, await _aarea_version(lat, lon, db_session))
 
-    events = fetch_local_events(booking.location, booking.start_date.isoformat(), booking.end_date.isoformat())
+# A build that stores places around its city (a cold city's first plan) bumps the version its key was
+# made with; such a plan would sit under a key nobody looks up, so it is only cached if the key still holds.
+
+def _complete() -> bool:
+    """Only plans built (in this deadline scope) without cutting corners or upstream failures are worth caching."""
+    return not deadline.degraded() and not deadline.failed()
+
+async def abuild_plan(booking, preferences, ask, db_session):
+    """Deterministic mode serves repeats of a request from the plan cache without any external call.
+
+    `db_session` is an AsyncSession.
+    """
+    if not settings.deterministic_plans:
+        return await _abuild_plan(booking, preferences, ask, random.Random())
+    key = plan_key(booking, preferences, ask)
+    cache_key = await _aplan_cache_key(key, booking.location, db_session)
+    current = True
+
+    async def build():
+        nonlocal current
+        plan = await _abuild_plan(booking, preferences, ask, random.Random(key))
+        current = await _aplan_cache_key(key, booking.location) == cache_key
+        return plan
+
+    return await _PLAN_CACHE.aget_or_fetch(cache_key, build, keep=lambda plan: current and _complete())
+
+async def astream_plan(booking, preferences, ask, db_session):
+    """abuild_plan as a stream of (stage, payload); see _abuild_stages. Ends with ("plan", full plan).
+
+    A cached plan is replayed stage by stage; a fresh one is cached once complete.
+    """
+    cache_key = None
+    if settings.deterministic_plans:
+        key = plan_key(booking, preferences, ask)
+        cache_key = await _aplan_cache_key(key, booking.location, db_session)
+        cached = await _PLAN_CACHE.alookup(cache_key)
+        if cached:
+            for stage in _split_stages(cached):
+                yield stage
+            yield "plan", cached
+            return
+        rng = random.Random(key)
+    else:
+        rng = random.Random()
+    plan: Dict = {"itinerary": []}
+    async for stage, payload in _abuild_stages(booking, preferences, ask, rng):
+        _merge_stage(plan, stage, payload)
+        yield stage, payload
+    if cache_key and _complete() and await _aplan_cache_key(key, booking.location) == cache_key:
+        await _PLAN_CACHE.astore(cache_key, plan)
+    yield "plan", plan
+
+def _merge_stage(plan: Dict, stage: str, payload) -> None:
+    if stage == "day":
+        plan["itinerary"].append(payload)
+    elif stage == "weather":
+        plan.update(payload)
+    else:
+        plan[stage] = payload
+
+def _split_stages(plan: Dict):
+    yield "weather", {k: plan[k] for k in ("weather_summary", "packing_checklist")}
+    yield "restaurants", plan["restaurants"]
+    for day in plan["itinerary"]:
+        yield "day", day
+    yield "notes", plan.get("notes")
+
+async def abuild_plans(items: List[tuple], db_session) -> List:
+    """abuild_plan for many (booking, preferences, ask) at once: a plan dict or the Exception, per item.
+
+    Cached plans are served as-is. The rest are grouped by location, and each
+    group geocodes, fetches weather and events for its overall date span, and
+    loads (or fetches) places once; per item only the ask parse, filtering
+    and itinerary remain.
+    """
+    results: List = [None] * len(items)
+    cache_keys: Dict[int, str] = {}
+    groups: Dict[str, List[int]] = {}
+    for i, (booking, preferences, ask) in enumerate(items):
+        if settings.deterministic_plans:
+            try:
+                cache_keys[i] = await _aplan_cache_key(plan_key(booking, preferences, ask), booking.location, db_session)
+            except Exception:
+                pass  # the key's geocode failed: the group's own geocode reports it for this item
+            cached = await _PLAN_CACHE.alookup(cache_keys[i]) if i in cache_keys else None
+            if cached:
+                results[i] = cached
+                continue
+        groups.setdefault(normalize(booking.location), []).append(i)
+    await asyncio.gather(*(_abuild_group(items, idxs, results, cache_keys) for idxs in groups.values()))
+    return results
+
+async def _abuild_group(items: List[tuple], idxs: List[int], results: List, cache_keys: Dict[int, str]) -> None:
+    with deadline.scope():  # a slow or failed location must not mark other locations' plans
+        await _abuild_location(items, idxs, results, cache_keys)
+
+async def _aparse_scoped(ask: str):
+    """aparse_free_text, plus the (degraded, failed) sections of this ask alone."""
+    with deadline.scope():
+        return await aparse_free_text(ask), (deadline.degraded(), deadline.failed())
+
+async def _abuild_location(items: List[tuple], idxs: List[int], results: List, cache_keys: Dict[int, str]) -> None:
+    location = items[idxs[0]][0].location
+    start = min(items[i][0].start_date for i in idxs)
+    end = max(items[i][0].end_date for i in idxs)
+    try:
+        lat, lon = await ageocode_city(location)
+
+        async def places():
+            # filters depend on the parsed asks; each set is applied before the near_limit cap
+            parsed = await asyncio.gather(*(_aparse_scoped(items[i][2]) for i in idxs))
+            prefs = [_resolve_prefs(items[i][1], over) for i, (over, _) in zip(idxs, parsed)]
+            filters = {_poi_filter(p[0], p[1]) for p in prefs}
+            return prefs, [asked for _, asked in parsed], await _agroup_places(location, lat, lon, filters)
+
+        weather, events, (prefs, asked, (pois, restaurants)) = await asyncio.gather(
+            adaily_weather(lat, lon, start, end),
+            afetch_local_events(location, start.isoformat(), end.isoformat()),
+            places(),
+        )
+    except Exception as e:
+        for i in idxs:
+            results[i] = e
+        return
+
+    def assemble(i: int, item_prefs: tuple):
+        booking, preferences, ask = items[i]
+        interests, mobility, dietary, price_tier = item_prefs
+        item_pois = [{**p, "price_tier": p["price_tier"] or price_tier} for p in pois[_poi_filter(interests, mobility)]]
+        item_restos = _soft_dietary_rank(
+            [{**r, "price_tier": r["price_tier"] or price_tier} for r in restaurants], dietary
+        )[: settings.max_restaurants]
+        rng = random.Random(plan_key(booking, preferences, ask)) if settings.deterministic_plans else random.Random()
+        return _assemble_plan(booking, price_tier, mobility, lat, lon,
+                              weather_store.subrange(weather, booking.start_date, booking.end_date),
+                              item_pois, item_restos, events, rng)
+
+    def build(i: int, item_prefs: tuple, item_asked: tuple):
+        with deadline.scope(*item_asked):  # this location's sections and this item's ask
+            return assemble(i, item_prefs), _complete()
+
+    # itineraries are numpy-heavy; build them side by side off the event loop
+    built = await asyncio.gather(*(asyncio.to_thread(build, i, p, a) for i, p, a in zip(idxs, prefs, asked)),
+                                 return_exceptions=True)
+    version = await _aarea_version(lat, lon) if cache_keys else None
+    for i, out in zip(idxs, built):
+        results[i] = out if isinstance(out, Exception) else out[0]
+        if (i in cache_keys and not isinstance(out, Exception) and out[1]
+                and make_key(plan_key(*items[i]), version) == cache_keys[i]):
+            await _PLAN_CACHE.astore(cache_keys[i], out[0])
+
+def _poi_filter(interests: List[str], mobility: str | None) -> tuple:
+    """Hashable (interests, mobility): items asking for the same places share one load."""
+    return tuple(sorted({normalize(i) for i in interests or [] if i.strip()})), mobility or None
+
+async def _agroup_places(location: str, lat: float, lon: float, filters=frozenset({((), None)})):
+    """({filter: POIs}, restaurants) near a city, price_tier None where the item's tier applies.
+
+    Each `_poi_filter` set is loaded on its own, filtered before the near_limit
+    cap as for a single plan; one OSM fetch covers whatever came up empty.
+    """
+    async with AsyncSessionLocal() as s:
+        pois = {f: await _aload_pois(location, list(f[0]), f[1], None, s, lat, lon) for f in filters}
+        restaurants = await _aload_restaurants(location, None, s, lat, lon)
+        empty = [f for f, cards in pois.items() if not cards]
+        if not empty and restaurants:
+            return pois, restaurants
+        FALLBACKS["osm_pois"] += bool(empty)
+        FALLBACKS["osm_restaurants"] += not restaurants
+        osm_pois, osm_restos = await afetch_osm_places(lat, lon, settings.radius_km, settings.max_radius_km)
+        await _acache_osm_into_db(location, osm_pois if empty else [], [] if restaurants else osm_restos, s)
+    osm_pois = [{**p, "price_tier": None} for p in osm_pois]
+    for f in empty:
+        pois[f] = _filter_osm_pois(osm_pois, list(f[0]), f[1], None)
+    return pois, restaurants or [{**r, "price_tier": r.get("price_tier")} for r in osm_restos]
+
+async def _abuild_plan(booking, preferences, ask, rng: random.Random):
+    plan: Dict = {"itinerary": []}
+    async for stage, payload in _abuild_stages(booking, preferences, ask, rng):
+        _merge_stage(plan, stage, payload)
+    return plan
+
+async def _abuild_stages(booking, preferences, ask, rng: random.Random):
+    """Async build_plan, yielding (stage, payload) as each part is ready.
+
+    Stages: "weather" (summary + packing list), "restaurants", one "day" per
+    date, then "notes". Independent lookups run concurrently; only the real
+    dependencies are kept in order: weather and OSM wait for the geocode, and
+    place filtering waits for the parsed ask. The two pickers run side by
+    side, so each gets its own AsyncSession (one session is not safe to share
+    across concurrent awaits).
+    """
+    geo = asyncio.create_task(ageocode_city(booking.location))
+
+    async def _weather():
+        lat, lon = await geo
+        return await adaily_weather(lat, lon, booking.start_date, booking.end_date)
+
+    weather_task = asyncio.create_task(_weather())
+    events_task = asyncio.create_task(
+        afetch_local_events(booking.location, booking.start_date.isoformat(), booking.end_date.isoformat())
+    )
+    tasks = [geo, weather_task, events_task]
+    try:
+        overrides = await aparse_free_text(ask) if ask else {}
+        interests, mobility, dietary, price_tier = _resolve_prefs(preferences, overrides)
+        lat, lon = await geo
+
+        async def _pois():
+            async with AsyncSessionLocal() as s:
+                return await apick_activities(booking.location, interests, mobility, price_tier, s, lat, lon)
+
+        async def _restaurants():
+            async with AsyncSessionLocal() as s:
+                return await apick_restaurants(booking.location, dietary, price_tier, s, lat, lon)
+
+        pois_task = asyncio.create_task(_pois())
+        restaurants_task = asyncio.create_task(_restaurants())
+        tasks += [pois_task, restaurants_task]
+
+        yield "weather", _weather_stage(await weather_task, mobility)
+        restaurants = await restaurants_task
+        yield "restaurants", restaurants
+        pois, events = await asyncio.gather(pois_task, events_task)
+        for day in _itinerary(booking, price_tier, lat, lon, pois, restaurants, events, rng):
+            yield "day", day
+        yield "notes", _notes(booking, pois, restaurants)
+    finally:
+        # a consumer that stops early (client gone) must not leave lookups running
+        for t in tasks:
+            t.cancel()
+
+def _weather_stage(weather, mobility: str | None) -> Dict:
+    return {"weather_summary": summarize_weather(weather), "packing_checklist": packing_list(weather, mobility)}
+
+@timed("itinerary")
+def _itinerary(booking, price_tier: str, lat: float, lon: float,
+               pois: List[Dict], restaurants: List[Dict], events: List[Dict], rng: random.Random) -> List[Dict]:
     event_cards = [{
         "title": e["name"],
         "address": booking.location,
@@ -186,48 +548,26 @@ def build_plan(booking, preferences, ask, db_session):
     activity_restaurants = _restaurants_as_activities(restaurants)
     combined_pool = pois + event_cards + activity_restaurants
 
-    # Cap to a reasonable size to avoid overly large itineraries
-    if len(combined_pool) > 60:
-        combined_pool = combined_pool[:60]
-
-    itinerary: List[Dict] = []
+    # One geographic cluster per day, stops in travel order from the city centre
     days = list(daterange(booking.start_date, booking.end_date))
-    items_per_day = 3
-
-    if not combined_pool:
-        for d in days:
-            itinerary.append({
-                "date": d.isoformat(),
-                "blocks": allocate_blocks([])
-            })
-    else:
-        # Shuffle once, then create cycles; repeats only after the whole pool is used
-        base_pool = combined_pool[:]
-        random.shuffle(base_pool)
-        needed = len(days) * items_per_day
-        sequence: List[Dict] = []
-        while len(sequence) < needed:
-            # add a full non-repeating pass
-            sequence.extend(random.sample(base_pool, k=len(base_pool)))
-
-        for i, d in enumerate(days):
-            start = i * items_per_day
-            day_slice = sequence[start:start+items_per_day]
-            itinerary.append({
-                "date": d.isoformat(),
-                "blocks": allocate_blocks(day_slice)
-            })
+    per_day = plan_days(combined_pool, len(days), 3, (lat, lon), rng)
+    return [{"date": d.isoformat(), "blocks": allocate_blocks(items)} for d, items in zip(days, per_day)]
 
+def _notes(booking, pois: List[Dict], restaurants: List[Dict]) -> str:
     note_bits = [f"Auto-fetched within {settings.radius_km}–{settings.max_radius_km}km of {booking.location} (OSM)."]
     if not pois:
         note_bits.append("No POIs found; try increasing RADIUS_KM.")
     if not restaurants:
         note_bits.append("No restaurants found; dietary tags on OSM are sparse.")
+    if late := deadline.degraded():
+        note_bits.append(f"Partial results to stay within the time budget: {', '.join(late)}.")
+    return " ".join(note_bits)
 
+def _assemble_plan(booking, price_tier: str, mobility: str | None, lat: float, lon: float,
+                   weather, pois: List[Dict], restaurants: List[Dict], events: List[Dict], rng: random.Random):
     return {
-        "itinerary": itinerary,
+        "itinerary": _itinerary(booking, price_tier, lat, lon, pois, restaurants, events, rng),
         "restaurants": restaurants,
-        "packing_checklist": pack,
-        "weather_summary": weather_summary,
-        "notes": " ".join(note_bits),
+        **_weather_stage(weather, mobility),
+        "notes": _notes(booking, pois, restaurants),
     }
@@ -0,0 +1,93 @@
+"""Deterministic extractor for the free-text ``ask``.
+
+Maps keywords/regexes to budget tier, dietary, mobility and interests. An ask
+is *confident* when every word in it is either recognised or filler, so the
+LLM is only needed for asks with content the rules do not understand.
+"""
+from __future__ import annotations
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from .cache import register_stats
+from .utils import normalize
+
+STATS = register_stats("ask_parse", Counter(rules=0, llm=0))
+
+# most specific first: "$$$" must not be read as "$"
+BUDGET = [
+    ("$$$", r"luxury|luxurious|upscale|fancy|splurge|high[- ]end|fine dining|expensive|\$\$\$"),
+    ("$$", r"mid[- ]range|moderate|moderately priced|reasonable|\$\$"),
+    ("$", r"cheap|budget|inexpensive|affordable|low[- ]cost|frugal|\$"),
+]
+
+DIETARY = [
+    ("vegan", r"vegan|plant[- ]based"),
+    ("vegetarian", r"vegetarian|veggie|no meat"),
+    ("gluten-free", r"gluten[- ]free|celiac|coeliac|no gluten"),
+    ("halal", r"halal"),
+    ("kosher", r"kosher"),
+]
+
+MOBILITY = [
+    ("wheelchair", r"wheelchair|accessible|accessibility|step[- ]free"),
+    ("stroller", r"stroller|pram|pushchair|buggy"),
+    ("no-long-hikes", r"no (?:long )?hik(?:e|es|ing)|short walks?|limited walking|can'?t walk far|bad knees?"),
+]
+
+INTERESTS = [
+    ("museum", r"museums?"),
+    ("art", r"art|arts|galler(?:y|ies)|paintings?"),
+    ("science", r"science|scientific|planetarium"),
+    ("history", r"history|historic(?:al)?|heritage"),
+    ("park", r"parks?|outdoors?|nature"),
+    ("garden", r"gardens?|botanical"),
+    ("viewpoint", r"views?|viewpoints?|scenic|lookouts?"),
+    ("zoo", r"zoos?|animals?|aquarium"),
+    ("kid-friendly", r"kids?|children|family|families|kid[- ]friendly"),
+    ("coffee", r"coffee|espresso"),
+    ("cafe", r"cafes?|cafés?"),
+    ("bakery", r"bakery|bakeries|pastr(?:y|ies)"),
+    ("brunch", r"brunch"),
+    ("theatre", r"theat(?:er|re)s?|shows?|plays?"),
+    ("library", r"librar(?:y|ies)|books?"),
+    ("attraction", r"attractions?|sights?|sightseeing|landmarks?"),
+]
+
+FILLER = set("""
+a an and or the with without for to of in on at by from my our we i me us please
+want wanna would like love prefer need needs looking some any lots lot more less
+very really mostly also plus food options option places place spots spot things
+stuff trip travel visit visiting see seeing do doing eat eating friendly only
+is are be it its that this something somewhere good great nice best price prices
+priced day days time trips tour tours stay staying
+""".split())
+
+def _compile(rules):
+    return [(value, re.compile(rf"(?<![\w-])(?:{rx})(?![\w-])")) for value, rx in rules]
+
+_BUDGET, _DIETARY, _MOBILITY, _INTERESTS = map(_compile, (BUDGET, DIETARY, MOBILITY, INTERESTS))
+
+def _first(rules, text: str) -> Tuple[str | None, str]:
+    for value, rx in rules:
+        if rx.search(text):
+            return value, rx.sub(" ", text)
+    return None, text
+
+def extract(ask: str) -> Tuple[Dict, bool]:
+    """(preferences, confident) in the same shape as the LLM parse."""
+    text = normalize(ask)
+    out: Dict = {}
+    for key, rules in (("budget_tier", _BUDGET), ("dietary", _DIETARY), ("mobility", _MOBILITY)):
+        value, text = _first(rules, text)
+        if value:
+            out[key] = value
+    interests: List[str] = []
+    for value, rx in _INTERESTS:
+        if rx.search(text):
+            interests.append(value)
+            text = rx.sub(" ", text)
+    if interests:
+        out["interests"] = interests
+    leftover = [w for w in re.findall(r"[a-z][a-z'-]*", text) if w not in FILLER]
+    return out, bool(out) and not leftover
@@ -0,0 +1,68 @@
+"""Content-addressed, compressed storage for plan payloads.
+
+A payload is keyed by the sha256 of its JSON bytes, so identical plans
+(deterministic repeats, batch siblings) are stored once. The API stores the
+exact bytes it sends (``put_raw``) and serves them back as-is (``get_raw``);
+other payloads go through ``canonical``. zstd is used when
+the optional ``zstandard`` package is installed, zlib otherwise; the codec is
+stored per row, so both can be read back whatever is installed now.
+"""
+from __future__ import annotations
+import hashlib
+import zlib
+from typing import Any, Tuple
+
+import orjson
+from sqlalchemy import select
+
+from .db import insert_ignore
+from .models import PlanBlob
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+CODEC = "zstd" if zstandard else "zlib"
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 9
+
+def canonical(payload: Any) -> bytes:
+    return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)
+
+def encode(raw: bytes) -> Tuple[str, dict]:
+    """(hash, plan_blobs row) for JSON bytes."""
+    if CODEC == "zstd":
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        data = zlib.compress(raw, ZLIB_LEVEL)
+    digest = hashlib.sha256(raw).hexdigest()
+    return digest, {"hash": digest, "codec": CODEC, "data": data, "size": len(raw)}
+
+def decode(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("plan blob is zstd-compressed; install zstandard to read it")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"unknown plan blob codec {codec!r}")
+    return raw
+
+def put_raw(conn, raw: bytes) -> str:
+    """Store JSON bytes unless their hash is already there; returns the hash. `conn` is a sync Connection/Session."""
+    digest, row = encode(raw)
+    insert_ignore(conn, PlanBlob.__table__, [row])
+    return digest
+
+def put(conn, payload: Any) -> str:
+    return put_raw(conn, canonical(payload))
+
+def get_raw(conn, digest: str) -> bytes | None:
+    row = conn.execute(select(PlanBlob.codec, PlanBlob.data).where(PlanBlob.hash == digest)).first()
+    return decode(row.codec, row.data) if row else None
+
+def get(conn, digest: str) -> Any | None:
+    raw = get_raw(conn, digest)
+    return None if raw is None else orjson.loads(raw)
@@ -0,0 +1,187 @@
+"""Persistent TTL cache in the service database, with stale-while-revalidate.
+
+Entries younger than ``ttl_s`` are served as-is. Entries up to ``stale_s``
+past that are served immediately while one background refresh replaces them.
+Anything older (or missing) is fetched inline. Empty fetch results are never
+stored, and an expired entry is still preferred over an empty fetch.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+from .db import engine
+from .models import CacheEntry
+
+logger = logging.getLogger("uvicorn.error")
+
+_STATS: Dict[str, Counter] = {}
+_TABLE = CacheEntry.__table__
+
+def make_key(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def register_stats(namespace: str, counter: Counter) -> Counter:
+    _STATS[namespace] = counter
+    return counter
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {ns: dict(c) for ns, c in _STATS.items()}
+
+class LRU:
+    """Tiny thread-safe in-process LRU."""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+class PersistentCache:
+    def __init__(self, namespace: str, ttl_s: float, stale_s: float = 0.0):
+        self.namespace = namespace
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.stats: Counter = register_stats(
+            namespace, Counter(hits=0, stale_hits=0, misses=0, coalesced=0, refreshes=0, errors=0)
+        )
+        self._refreshing: set[str] = set()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._tasks: set[asyncio.Task] = set()
+
+    # ---- storage ----
+
+    def get(self, key: str):
+        """(value, age_s) or None; ignores TTLs."""
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(_TABLE.c.value, _TABLE.c.updated_at)
+                .where(_TABLE.c.namespace == self.namespace, _TABLE.c.key == key)
+            ).first()
+        if row is None:
+            return None
+        return row.value, time.time() - row.updated_at
+
+    def put(self, key: str, value) -> None:
+        now = time.time()
+        with engine.begin() as conn:
+            res = conn.execute(
+                update(_TABLE)
+                .where(_TABLE.c.namespace == self.namespace, _TABLE.c.key == key)
+                .values(value=value, updated_at=now)
+            )
+            if res.rowcount:
+                return
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(_TABLE).values(namespace=self.namespace, key=key, value=value, updated_at=now))
+        except IntegrityError:
+            pass  # a concurrent writer got there first; theirs is just as fresh
+
+    # ---- read-through ----
+
+    def _classify(self, hit):
+        if hit is None:
+            return "miss"
+        _, age = hit
+        if age < self.ttl_s:
+            return "fresh"
+        if age < self.ttl_s + self.stale_s:
+            return "stale"
+        return "expired"
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _store(self, key: str, value, keep: Callable[[Any], bool] | None = None):
+        if value and (keep is None or keep(value)):
+            try:
+                self.put(key, value)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("cache %s: write failed: %s", self.namespace, e)
+        return value
+
+    async def aget_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]], keep: Callable[[Any], bool] | None = None):
+        """`keep(value)` False: return the fetched value without storing it."""
+        hit = await asyncio.to_thread(self.get, key)
+        state = self._classify(hit)
+        if state == "fresh":
+            self.stats["hits"] += 1
+            return hit[0]
+        if state == "stale":
+            self.stats["stale_hits"] += 1
+            if self._claim_refresh(key):
+                task = asyncio.create_task(self._arefresh(key, fetch, keep))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return hit[0]
+        self.stats["misses"] += 1
+        value = await self._afetch_once(key, fetch, keep)
+        return value or (hit[0] if hit else value)
+
+    async def alookup(self, key: str):
+        """Servable cached value or None, for callers that produce and `astore` the value themselves."""
+        hit = await asyncio.to_thread(self.get, key)
+        state = self._classify(hit)
+        if state in ("fresh", "stale"):
+            self.stats["hits" if state == "fresh" else "stale_hits"] += 1
+            return hit[0]
+        self.stats["misses"] += 1
+        return None
+
+    async def astore(self, key: str, value):
+        return await asyncio.to_thread(self._store, key, value)
+
+    async def _afetch_once(self, key: str, fetch: Callable[[], Awaitable[Any]], keep=None):
+        """Concurrent misses for one key share a single upstream fetch."""
+        task = self._inflight.get(key)
+        if task is None:
+            async def run():
+                return await asyncio.to_thread(self._store, key, await fetch(), keep)
+            task = asyncio.create_task(run())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _arefresh(self, key: str, fetch: Callable[[], Awaitable[Any]], keep=None) -> None:
+        try:
+            self.stats["refreshes"] += 1
+            await asyncio.to_thread(self._store, key, await fetch(), keep)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning("cache %s: refresh failed: %s", self.namespace, e)
+        finally:
+            self._release_refresh(key)
@@ -0,0 +1,248 @@
+"""In-process, column-oriented copy of the pois / restaurants tables.
+
+Each table is held as NumPy columns sorted by latitude (lat, lon, duration,
+wheelchair/child flags, price code, city code) plus a uint64 tag bitmask
+per row, with the strings interned. A radius lookup is a binary search on
+the latitude band followed by vectorized longitude, haversine, interest and
+mobility masks, so plan requests never query these tables.
+
+Rows are only ever appended, so a refresh reads rows with ids past the last
+one seen, plus any id missing from the last CATALOG_REREAD_IDS (concurrent
+writers commit ids out of order), and rebuilds the columns. It runs after
+every OSM cache fill and, for rows other processes write, on the first
+lookup once CATALOG_REFRESH_S has passed. Readers take one immutable
+snapshot, so a refresh never blocks or tears a lookup.
+"""
+from __future__ import annotations
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+
+from .cache import register_stats
+from .config import settings
+from .db import engine
+from .geo import bbox
+from .itinerary import haversine_matrix
+from .models import POI, Restaurant
+from .utils import split_tags
+
+STATS = register_stats("catalog", Counter(lookups=0, refreshes=0, rows=0))
+
+PRICE_TIERS = (None, "$", "$$", "$$$")  # price column codes; 0 = unset / not a tier
+_PRICE_CODE = {t: i for i, t in enumerate(PRICE_TIERS) if t}
+
+def _intern(s: str | None) -> str:
+    return sys.intern(s or "")
+
+def _objects(values: list) -> np.ndarray:
+    out = np.empty(len(values), object)
+    for i, v in enumerate(values):  # item by item, so tuples stay tuples
+        out[i] = v
+    return out
+
+@dataclass(frozen=True)
+class _Columns:
+    ids: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    price: np.ndarray
+    city: np.ndarray
+    tagbits: np.ndarray          # (n, words) uint64
+    duration: np.ndarray
+    wheelchair: np.ndarray
+    child: np.ndarray
+    name: np.ndarray             # object columns from here on
+    address: np.ndarray
+    labels: np.ndarray           # the card's tag list, precomputed
+
+    def __len__(self):
+        return len(self.ids)
+
+def _empty() -> _Columns:
+    f = lambda dtype: np.empty(0, dtype=dtype)
+    return _Columns(f(np.int64), f(float), f(float), f(np.int8), f(np.int32), np.zeros((0, 1), np.uint64),
+                    f(np.int32), f(bool), f(bool), f(object), f(object), f(object))
+
+@dataclass
+class _Table:
+    model: type
+    cols: _Columns = field(default_factory=_empty)
+    tags: Dict[str, int] = field(default_factory=dict)     # normalized tag -> bit
+    cities: List[str] = field(default_factory=list)        # city code -> lowercased name
+    city_codes: Dict[str, int] = field(default_factory=dict)
+    max_id: int = 0
+
+    def _city(self, city: str) -> int:
+        if city not in self.city_codes:
+            self.city_codes[city] = len(self.cities)
+            self.cities.append(city.lower())
+        return self.city_codes[city]
+
+    def _bits(self, tags: List[str], words: int) -> List[int]:
+        out = [0] * words
+        for t in tags:
+            b = self.tags.setdefault(t, len(self.tags))
+            out[b // 64] |= 1 << (b % 64)
+        return out
+
+    def missing(self, ids: List[int]) -> List[int]:
+        """Which of `ids` (all at or below max_id) the columns lack."""
+        if not ids:
+            return []
+        known = set(self.cols.ids[self.cols.ids >= min(ids)].tolist())
+        return [i for i in ids if i not in known]
+
+    def extend(self, rows) -> int:
+        """Append DB rows; returns how many were new."""
+        known = set(self.cols.ids[self.cols.ids >= min(r.id for r in rows)].tolist()) if rows else set()
+        rows = [r for r in rows if r.id not in known]
+        if not rows:
+            return 0
+        is_poi = self.model is POI
+        parsed = [split_tags(r.tags) for r in rows]
+        for tags in parsed:
+            for t in tags:
+                self.tags.setdefault(t, len(self.tags))
+        words = max(1, -(-len(self.tags) // 64))
+        old = self.cols
+        bits = np.array([self._bits(t, words) for t in parsed], dtype=np.uint64).reshape(len(rows), words)
+        old_bits = np.zeros((len(old), words), np.uint64)
+        old_bits[:, :old.tagbits.shape[1]] = old.tagbits
+        if is_poi:
+            # as POI cards always showed them: split and stripped, case kept
+            labels = [tuple(_intern(t.strip()) for t in (r.tags or "").split(",") if t.strip()) for r in rows]
+        else:
+            labels = [tuple(_intern(t) for t in sorted(set(tags))) or ("restaurant",) for tags in parsed]
+        new = _Columns(
+            ids=np.array([r.id for r in rows], np.int64),
+            lat=np.array([r.lat for r in rows], float),
+            lon=np.array([r.lon for r in rows], float),
+            price=np.array([_PRICE_CODE.get(r.price_tier, 0) for r in rows], np.int8),
+            city=np.array([self._city(_intern(r.city)) for r in rows], np.int32),
+            tagbits=bits,
+            duration=np.array([r.duration_minutes if is_poi else 0 for r in rows], np.int32),
+            wheelchair=np.array([bool(r.wheelchair_friendly) if is_poi else False for r in rows]),
+            child=np.array([bool(r.child_friendly) if is_poi else False for r in rows]),
+            name=_objects([_intern(r.name) for r in rows]),
+            address=_objects([_intern(r.address) for r in rows]),
+            labels=_objects(labels),
+        )
+        merged = {k: np.concatenate([old_bits if k == "tagbits" else getattr(old, k), getattr(new, k)])
+                  for k in _Columns.__dataclass_fields__}
+        order = np.argsort(merged["lat"], kind="stable")
+        self.cols = _Columns(**{k: v[order] for k, v in merged.items()})
+        self.max_id = max(self.max_id, int(new.ids.max()))
+        return len(rows)
+
+    def select(self, city: str, lat: float, lon: float, radius_km: float, limit: int,
+               interests: List[str] | None = None, mobility: str | None = None) -> Tuple[_Columns, np.ndarray]:
+        """(snapshot, row indexes): up to `limit` nearest first within radius_km, or every city-name
+        match by id when there are no coordinates. Same filters as the SQL path in agent.py."""
+        cols = self.cols
+        if (lat, lon) != (0.0, 0.0):
+            min_lat, max_lat, min_lon, max_lon = bbox(lat, lon, radius_km)
+            lo = np.searchsorted(cols.lat, min_lat, side="left")
+            hi = np.searchsorted(cols.lat, max_lat, side="right")
+            idx = lo + np.flatnonzero((cols.lon[lo:hi] >= min_lon) & (cols.lon[lo:hi] <= max_lon))
+        else:
+            needle = city.split(",")[0].lower()
+            codes = [i for i, c in enumerate(self.cities) if needle in c]
+            idx = np.flatnonzero(np.isin(cols.city, codes))
+        wants = {i.strip().lower() for i in interests or [] if i.strip()}
+        if wants:
+            want = np.zeros(cols.tagbits.shape[1], np.uint64)
+            for t in wants:
+                b = self.tags.get(t)
+                if b is not None and b // 64 < len(want):  # bits past the snapshot's words: no row has them
+                    want[b // 64] |= np.uint64(1 << (b % 64))
+            idx = idx[(cols.tagbits[idx] & want).any(axis=1)]
+        if mobility == "wheelchair":
+            idx = idx[cols.wheelchair[idx]]
+        elif mobility == "no-long-hikes":
+            idx = idx[cols.duration[idx] <= 120]
+        if (lat, lon) == (0.0, 0.0):
+            return cols, idx[np.argsort(cols.ids[idx], kind="stable")]  # unlimited, like the SQL city scan
+        d = haversine_matrix(np.array([[lat, lon]]), np.column_stack([cols.lat[idx], cols.lon[idx]]))[0]
+        keep = d <= radius_km
+        idx, d = idx[keep], d[keep]
+        return cols, idx[np.argsort(d, kind="stable")][:limit]
+
+def _price(cols: _Columns, idx: np.ndarray, fallback: str | None) -> List[str | None]:
+    return [PRICE_TIERS[c] or fallback for c in cols.price[idx].tolist()]
+
+class Catalog:
+    def __init__(self):
+        self._tables = {POI: _Table(POI), Restaurant: _Table(Restaurant)}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.refreshed_at = 0.0  # time.monotonic()
+
+    def refresh(self) -> int:
+        """Pull rows added since the last refresh (everything, the first time)."""
+        with self._lock:
+            return self._refresh()
+
+    def due(self) -> bool:
+        return not self.loaded or time.monotonic() - self.refreshed_at >= settings.catalog_refresh_s
+
+    def refresh_if_due(self) -> int:
+        """`refresh` when `due`; a no-op while another refresh runs (lookups keep the current snapshot)."""
+        if not self.due() or not self._lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._refresh() if self.due() else 0
+        finally:
+            self._lock.release()
+
+    def _refresh(self) -> int:
+        with engine.connect() as conn:
+            added = 0
+            for model, table in self._tables.items():
+                floor = max(0, table.max_id - settings.catalog_reread_ids)
+                behind = table.missing(conn.scalars(
+                    select(model.id).where(model.id > floor, model.id <= table.max_id)).all())
+                newer = model.id > table.max_id
+                rows = conn.execute(select(model.__table__)
+                                    .where(or_(newer, model.id.in_(behind)) if behind else newer)
+                                    .order_by(model.id)).all()
+                added += table.extend(rows)
+            self.loaded = True
+        self.refreshed_at = time.monotonic()
+        STATS["refreshes"] += 1
+        STATS["rows"] += added
+        return added
+
+    def _table(self, model) -> _Table:
+        if not self.loaded:
+            self.refresh()
+        STATS["lookups"] += 1
+        return self._tables[model]
+
+    def pois(self, city: str, lat: float, lon: float, interests: List[str], mobility: str | None,
+             price_tier: str | None) -> List[Dict]:
+        cols, idx = self._table(POI).select(city, lat, lon, settings.max_radius_km, settings.near_limit,
+                                            interests, mobility)
+        return [{
+            "title": name, "address": address, "geo": (la, lo), "price_tier": price,
+            "duration_minutes": duration, "tags": list(labels),
+            "wheelchair_friendly": wheelchair, "child_friendly": child,
+        } for name, address, la, lo, price, duration, labels, wheelchair, child in zip(
+            cols.name[idx], cols.address[idx], cols.lat[idx].tolist(), cols.lon[idx].tolist(),
+            _price(cols, idx, price_tier), cols.duration[idx].tolist(), cols.labels[idx],
+            cols.wheelchair[idx].tolist(), cols.child[idx].tolist(),
+        )]
+
+    def restaurants(self, city: str, lat: float, lon: float, price_tier: str | None) -> List[Dict]:
+        cols, idx = self._table(Restaurant).select(city, lat, lon, settings.max_radius_km, settings.near_limit)
+        return [{"title": name, "address": address, "geo": (la, lo), "price_tier": price, "tags": list(labels)}
+                for name, address, la, lo, price, labels in zip(
+                    cols.name[idx], cols.address[idx], cols.lat[idx].tolist(), cols.lon[idx].tolist(),
+                    _price(cols, idx, price_tier), cols.labels[idx])]
+
+CATALOG = Catalog()
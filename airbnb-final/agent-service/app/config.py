@@ -7,24 +7,81 @@ load_dotenv()
 class Settings(BaseModel):
     port: int = int(os.getenv("PORT", "8088"))
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
+    # async driver URL; derived from DATABASE_URL (aiosqlite / asyncpg / asyncmy) when unset
+    async_database_url: str | None = os.getenv("ASYNC_DATABASE_URL") or None
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout_s: float = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
 
     openai_api_key: str | None = os.getenv("OPENAI_API_KEY") or None
     anthropic_api_key: str | None = os.getenv("ANTHROPIC_API_KEY") or None
     tavily_api_key: str | None = os.getenv("TAVILY_API_KEY") or None
 
+    # Upstream endpoints (overridable so load tests can point at local stubs)
+    geocode_url: str = os.getenv("GEOCODE_URL", "https://geocoding-api.open-meteo.com/v1/search")
+    forecast_url: str = os.getenv("FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+    tavily_url: str = os.getenv("TAVILY_URL", "https://api.tavily.com/search")
+    openai_base_url: str | None = os.getenv("OPENAI_BASE_URL") or None  # None = OpenAI's default
+
     # Dynamic place fetch config
     radius_km: float = float(os.getenv("RADIUS_KM", "5"))         # initial radius
     max_radius_km: float = float(os.getenv("MAX_RADIUS_KM", "15"))# we’ll expand up to this
     max_pois: int = int(os.getenv("MAX_POIS", "40"))
     max_restaurants: int = int(os.getenv("MAX_RESTAURANTS", "40"))
+    overpass_max_elements: int = int(os.getenv("OVERPASS_MAX_ELEMENTS", "400"))  # `out center N` of each filter's statement
+    # stop reading an Overpass response once each filter (museums..., parks..., restaurants...) has this many named places
+    overpass_places_per_filter: int = int(os.getenv("OVERPASS_PLACES_PER_FILTER", "100"))
+    # OSM elements with the same normalized name this close together are one venue (0 disables)
+    osm_dedup_radius_m: float = float(os.getenv("OSM_DEDUP_RADIUS_M", "40"))
+    near_limit: int = int(os.getenv("NEAR_LIMIT", "500"))          # nearest cached rows considered per lookup
+    # Serve cached places from in-process columns (loaded at startup, refreshed on OSM cache fills)
+    in_memory_catalog: bool = os.getenv("IN_MEMORY_CATALOG", "1") not in {"0", "false", "False"}
+    # ...and on the first lookup after this many seconds, for rows other processes wrote (prewarm, seeders, workers)
+    catalog_refresh_s: float = float(os.getenv("CATALOG_REFRESH_S", "30"))
+    # each refresh re-checks this many ids below the newest seen: concurrent writers can commit ids out of order
+    catalog_reread_ids: int = int(os.getenv("CATALOG_REREAD_IDS", "5000"))
+
+    # Per-request time budget for all upstream calls (X-Request-Deadline-Ms may ask for up to the max)
+    request_deadline_s: float = float(os.getenv("REQUEST_DEADLINE_S", "10"))
+    request_deadline_max_s: float = float(os.getenv("REQUEST_DEADLINE_MAX_S", "60"))
+
+    # Seed itinerary shuffles from the request hash and cache whole plans (0 = random plans, no cache)
+    deterministic_plans: bool = os.getenv("DETERMINISTIC_PLANS", "1") not in {"0", "false", "False"}
+    llm_parse_cache_ttl_s: float = float(os.getenv("LLM_PARSE_CACHE_TTL_S", str(30 * 86400)))
+    batch_max_items: int = int(os.getenv("BATCH_MAX_ITEMS", "500"))  # per /agent/plan/batch call
+    events_cache_ttl_s: float = float(os.getenv("EVENTS_CACHE_TTL_S", str(12 * 3600)))
+    # plans wait this long for events; later answers still fill the (city, ISO week) cache
+    events_budget_s: float = float(os.getenv("EVENTS_BUDGET_S", "1.0"))
+    prewarm_days: int = int(os.getenv("PREWARM_DAYS", "7"))             # trips starting this soon get warmed
+    prewarm_concurrency: int = int(os.getenv("PREWARM_CONCURRENCY", "4"))  # cities warmed at once
+    plan_run_lru_size: int = int(os.getenv("PLAN_RUN_LRU_SIZE", "256"))  # GET /agent/plan/{run_id}
+    plan_cache_ttl_s: float = float(os.getenv("PLAN_CACHE_TTL_S", str(6 * 3600)))
+
+    geocode_lru_size: int = int(os.getenv("GEOCODE_LRU_SIZE", "2048"))
+
+    # Per-day forecast store: grid size, freshness, and how far ahead the provider forecasts
+    weather_grid_deg: float = float(os.getenv("WEATHER_GRID_DEG", "0.1"))
+    weather_ttl_s: float = float(os.getenv("WEATHER_TTL_S", str(3 * 3600)))
+    weather_horizon_days: int = int(os.getenv("WEATHER_HORIZON_DAYS", "16"))
+
+    # Overpass responses cached in the DB, keyed by quantized center + radius + filters
+    overpass_cache_quantum_deg: float = float(os.getenv("OVERPASS_CACHE_QUANTUM_DEG", "0.01"))
+    overpass_cache_ttl_s: float = float(os.getenv("OVERPASS_CACHE_TTL_S", str(7 * 86400)))
+    overpass_cache_stale_s: float = float(os.getenv("OVERPASS_CACHE_STALE_S", str(30 * 86400)))
 
     # Try multiple Overpass mirrors to avoid rate-limits
     overpass_endpoints: list[str] = [
         # primary
         os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter"),
-        # fallbacks
-        "https://overpass.kumi.systems/api/interpreter",
-        "https://overpass.openstreetmap.ru/api/interpreter",
+        # fallbacks (comma-separated; set empty for none)
+        *filter(None, os.getenv(
+            "OVERPASS_FALLBACK_URLS",
+            "https://overpass.kumi.systems/api/interpreter,https://overpass.openstreetmap.ru/api/interpreter",
+        ).split(",")),
     ]
+    # Hedging: ask the next mirror if the current one hasn't answered after this long
+    overpass_hedge_delay_s: float = float(os.getenv("OVERPASS_HEDGE_DELAY_S", "1.5"))
+    overpass_breaker_failures: int = int(os.getenv("OVERPASS_BREAKER_FAILURES", "3"))
+    overpass_breaker_cooldown_s: float = float(os.getenv("OVERPASS_BREAKER_COOLDOWN_S", "60"))
 
 settings = Settings()
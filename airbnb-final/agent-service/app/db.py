@@ -1,13 +1,84 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert, make_url
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, pool_recycle=3600)
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "asyncmy", "mariadb": "asyncmy"}
+
+def async_url(url: str) -> str:
+    """The same database behind its asyncio driver: sqlite -> aiosqlite, postgresql -> asyncpg, mysql -> asyncmy."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise NotImplementedError(f"no async driver known for {backend!r}; set ASYNC_DATABASE_URL")
+    return u.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def _pool_kwargs(url: str) -> dict:
+    u = make_url(url)
+    kw = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow,
+          "pool_timeout": settings.db_pool_timeout_s}
+    if u.get_backend_name() == "sqlite" and (u.database in (None, "", ":memory:") or u.get_driver_name() == "aiosqlite"):
+        # in-memory: single-connection pool; aiosqlite: NullPool, since a pooled connection's
+        # worker thread is non-daemon and would keep the process alive after the loop ends
+        return {}
+    return kw
+
+engine = create_engine(settings.database_url, pool_pre_ping=True, pool_recycle=3600,
+                       **_pool_kwargs(settings.database_url))
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
-def get_db():
-    db = SessionLocal()
-    try:
+_ASYNC_URL = settings.async_database_url or async_url(settings.database_url)
+async_engine = create_async_engine(_ASYNC_URL, pool_pre_ping=True, pool_recycle=3600, **_pool_kwargs(_ASYNC_URL))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_adb():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def _dialect(conn) -> str:
+    return conn.get_bind().dialect.name if hasattr(conn, "get_bind") else conn.dialect.name
+
+def insert_ignore(conn, table, rows: list[dict]) -> int:
+    """Bulk INSERT that silently skips rows hitting a unique key; returns how many rows went in.
+
+    `conn` is a sync Connection or Session (from async code, go through `run_sync`). Uses ON CONFLICT DO NOTHING on SQLite/Postgres
+    and INSERT IGNORE on MySQL, so the database does the dedup in one statement. Drivers that don't
+    report a rowcount for executemany (-1) count as all rows inserted.
+    """
+    if not rows:
+        return 0
+    dialect = _dialect(conn)
+    if dialect == "sqlite":
+        stmt = sqlite_insert(table).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = pg_insert(table).on_conflict_do_nothing()
+    elif dialect in ("mysql", "mariadb"):
+        stmt = insert(table).prefix_with("IGNORE")
+    else:
+        raise NotImplementedError(f"insert_ignore: unsupported dialect {dialect!r}")
+    inserted = conn.execute(stmt, rows).rowcount
+    return inserted if inserted >= 0 else len(rows)
+
+def upsert(conn, table, rows: list[dict]):
+    """Bulk INSERT that overwrites the non-key columns of rows whose primary key already exists.
+
+    Same dialect support and `conn` as `insert_ignore`; one statement, so
+    concurrent writers of the same keys never conflict.
+    """
+    if not rows:
+        return
+    keys = [c.name for c in table.primary_key.columns]
+    cols = [c for c in rows[0] if c not in keys]
+    dialect = _dialect(conn)
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(table)
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_={c: stmt.excluded[c] for c in cols})
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in cols})
+    else:
+        raise NotImplementedError(f"upsert: unsupported dialect {dialect!r}")
+    conn.execute(stmt, rows)
@@ -0,0 +1,118 @@
+"""Per-request deadline shared by every outbound call, and the sections degraded to meet it.
+
+The deadline comes from the ``X-Request-Deadline-Ms`` header (relative,
+clamped to REQUEST_DEADLINE_MAX_S) or REQUEST_DEADLINE_S. Each upstream call
+waits ``remaining(its own timeout)``; when that runs out the caller falls back
+(stale cache, fewer results, rules instead of the LLM) and calls
+``degrade(section)``. Degraded plans say so in their notes and are not put in
+the plan cache. Sections whose upstream failed outright (and fell back to
+nothing) are recorded with ``fail(section)``; those plans are not cached
+either. Outside a request there is no deadline and nothing is recorded.
+
+Like metrics spans, the state lives in a contextvar, so tasks and threads
+started by the request share it. Work whose results stand alone (each
+location and item of a batch) runs in its own ``scope()``, so its sections
+don't mark the others.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, List
+
+from .cache import register_stats
+from .config import settings
+
+HEADER = b"x-request-deadline-ms"
+MIN_TIMEOUT_S = 0.05  # floor for calls made at the last moment; they fail fast rather than not at all
+
+STATS = register_stats("degraded", Counter())
+FAILED = register_stats("failed", Counter())
+
+@dataclass
+class _Budget:
+    deadline: float                       # time.monotonic()
+    degraded: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
+_BUDGET: ContextVar[_Budget | None] = ContextVar("budget", default=None)
+
+def start(seconds: float):
+    """Begin a budget of `seconds` in the current context; returns the token for `_BUDGET.reset`."""
+    return _BUDGET.set(_Budget(time.monotonic() + seconds))
+
+def remaining(timeout_s: float) -> float:
+    """`timeout_s`, shortened to what is left of the request's budget."""
+    b = _BUDGET.get()
+    if b is None:
+        return timeout_s
+    return max(MIN_TIMEOUT_S, min(timeout_s, b.deadline - time.monotonic()))
+
+def expired() -> bool:
+    b = _BUDGET.get()
+    return b is not None and time.monotonic() >= b.deadline
+
+def degrade(section: str) -> None:
+    b = _BUDGET.get()
+    if b is not None and section not in b.degraded:
+        b.degraded.append(section)
+        STATS[section] += 1
+
+def degraded() -> List[str]:
+    b = _BUDGET.get()
+    return list(b.degraded) if b else []
+
+@contextmanager
+def scope(degraded: List[str] = (), failed: List[str] = ()):
+    """Same deadline, own sections: starting from the enclosing ones plus `degraded`/`failed`."""
+    b = _BUDGET.get()
+    token = _BUDGET.set(None if b is None else _Budget(
+        b.deadline, list(dict.fromkeys([*b.degraded, *degraded])), list(dict.fromkeys([*b.failed, *failed]))))
+    try:
+        yield
+    finally:
+        _BUDGET.reset(token)
+
+def fail(section: str) -> None:
+    b = _BUDGET.get()
+    if b is not None and section not in b.failed:
+        b.failed.append(section)
+        FAILED[section] += 1
+
+def failed() -> List[str]:
+    b = _BUDGET.get()
+    return list(b.failed) if b else []
+
+async def bounded(aw: Awaitable, timeout_s: float, section: str, fallback: Any = None):
+    """`aw` within remaining(timeout_s); on timeout, degrade(section) and return `fallback`."""
+    try:
+        return await asyncio.wait_for(aw, remaining(timeout_s))
+    except asyncio.TimeoutError:
+        degrade(section)
+        return fallback
+
+def _budget_s(headers) -> float:
+    for k, v in headers:
+        if k == HEADER:
+            try:
+                return min(max(float(v) / 1000, MIN_TIMEOUT_S), settings.request_deadline_max_s)
+            except ValueError:
+                break
+    return settings.request_deadline_s
+
+class DeadlineMiddleware:
+    """Starts each HTTP request's budget."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = start(_budget_s(scope.get("headers") or []))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _BUDGET.reset(token)
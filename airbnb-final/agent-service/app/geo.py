@@ -0,0 +1,48 @@
+"""Small spatial helpers: haversine distance and a fixed lat/lon grid.
+
+Rows carry the id of the grid cell they fall in (``geocell``), so a radius
+lookup becomes an indexed ``IN`` over the handful of cells covering the
+bounding box, followed by an exact haversine check.
+"""
+from __future__ import annotations
+import math
+from typing import List, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEG = 0.1                     # ~11 km of latitude per cell
+_LON_CELLS = int(360 / CELL_DEG)
+MAX_CELLS = 256                    # past this the bbox alone is the cheaper predicate
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _lat_idx(lat: float) -> int:
+    return min(int((lat + 90.0) // CELL_DEG), int(180 / CELL_DEG) - 1)
+
+def _lon_idx(lon: float) -> int:
+    return int((lon + 180.0) // CELL_DEG) % _LON_CELLS
+
+def cell_id(lat: float, lon: float) -> int:
+    return _lat_idx(lat) * _LON_CELLS + _lon_idx(lon)
+
+def bbox(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle; clamped at the poles/antimeridian."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    coslat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * coslat)))
+    return (max(-90.0, lat - dlat), min(90.0, lat + dlat),
+            max(-180.0, lon - dlon), min(180.0, lon + dlon))
+
+def cells_for_bbox(min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> List[int] | None:
+    """Cell ids covering the box, or None when there are too many to be useful."""
+    lat_lo, lat_hi = _lat_idx(min_lat), _lat_idx(max_lat)
+    lon_lo, lon_hi = _lon_idx(min_lon), _lon_idx(max_lon)
+    if lon_hi < lon_lo:  # max_lon == 180 wraps to column 0
+        lon_hi = _LON_CELLS - 1
+    if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) > MAX_CELLS:
+        return None
+    return [la * _LON_CELLS + lo for la in range(lat_lo, lat_hi + 1) for lo in range(lon_lo, lon_hi + 1)]
@@ -0,0 +1,139 @@
+"""Layered geocoder: in-process LRU -> geocodes table -> offline gazetteer -> remote API.
+
+Every hit below the LRU is promoted upwards, so a place text normally
+leaves the box at most once. Failed lookups ((0.0, 0.0)) are never cached,
+and a failed cache write never fails the lookup.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Iterable, List, Tuple
+
+from sqlalchemy import select, func, insert, delete
+
+from .cache import LRU, register_stats
+from .config import settings
+from .db import SessionLocal, engine, insert_ignore
+from .models import Geocode, GazetteerEntry, POI
+from .utils import normalize
+
+logger = logging.getLogger("uvicorn.error")
+
+LatLon = Tuple[float, float]
+MISS: LatLon = (0.0, 0.0)
+
+_LRU = LRU(settings.geocode_lru_size)
+STATS = register_stats("geocode", Counter(lru=0, db=0, gazetteer=0, remote=0, failed=0))
+
+def _split(text: str) -> Tuple[str, List[str]]:
+    """'New York, NY, US' -> ('new york', ['ny', 'us'])."""
+    parts = [p.strip() for p in normalize(text).split(",") if p.strip()]
+    return (parts[0] if parts else ""), parts[1:]
+
+# ---- persistent layers (sync; the async path runs them in a thread) ----
+
+def _from_db(key: str) -> LatLon | None:
+    with SessionLocal() as db:
+        row = db.get(Geocode, key)
+        return (row.lat, row.lon) if row else None
+
+def _from_gazetteer(text: str) -> LatLon | None:
+    name, qualifiers = _split(text)
+    if not name:
+        return None
+    with SessionLocal() as db:
+        rows = db.scalars(
+            select(GazetteerEntry).where(GazetteerEntry.name == name)
+            .order_by(GazetteerEntry.population.desc()).limit(50)
+        ).all()
+    if not rows:
+        return None
+    if qualifiers:
+        quals = set(qualifiers)
+        matching = [r for r in rows if quals & {(r.admin or "").lower(), (r.country or "").lower()}]
+        rows = matching or rows
+    return rows[0].lat, rows[0].lon
+
+def _save(key: str, latlon: LatLon, source: str) -> None:
+    """Remember a geocode; concurrent first lookups of one place all write it, the first row stays."""
+    try:
+        with SessionLocal() as db:
+            insert_ignore(db, Geocode.__table__, [{"query": key, "lat": latlon[0], "lon": latlon[1], "source": source}])
+            db.commit()
+    except Exception as e:
+        logger.warning("geocode %r: cache write failed: %s", key, e)
+
+def _local(text: str) -> Tuple[LatLon | None, str]:
+    key = normalize(text)
+    hit = _from_db(key)
+    if hit:
+        return hit, "db"
+    hit = _from_gazetteer(text)
+    if hit:
+        _save(key, hit, "gazetteer")
+        return hit, "gazetteer"
+    return None, ""
+
+def _remember(text: str, latlon: LatLon, source: str) -> LatLon:
+    STATS[source] += 1
+    _LRU.put(normalize(text), latlon)
+    return latlon
+
+# ---- public ----
+
+async def alookup(text: str, remote: Callable[[str], Awaitable[LatLon]]) -> LatLon:
+    key = normalize(text)
+    hit = _LRU.get(key)
+    if hit:
+        STATS["lru"] += 1
+        return hit
+    hit, source = await asyncio.to_thread(_local, text)
+    if hit:
+        return _remember(text, hit, source)
+    latlon = await remote(text)
+    if latlon == MISS:
+        STATS["failed"] += 1
+        return MISS
+    await asyncio.to_thread(_save, key, latlon, "remote")
+    return _remember(text, latlon, "remote")
+
+# ---- gazetteer maintenance ----
+
+def import_rows(rows: Iterable[dict], source: str, batch: int = 5000) -> int:
+    """Bulk insert gazetteer rows (name/lat/lon + optional admin/country/population)."""
+    table = GazetteerEntry.__table__
+    n, buf = 0, []
+    with engine.begin() as conn:
+        for r in rows:
+            buf.append({
+                "name": normalize(r["name"]),
+                "admin": r.get("admin") or None,
+                "country": r.get("country") or None,
+                "lat": float(r["lat"]), "lon": float(r["lon"]),
+                "population": int(r.get("population") or 0),
+                "source": source,
+            })
+            if len(buf) >= batch:
+                conn.execute(insert(table), buf)
+                n += len(buf); buf = []
+        if buf:
+            conn.execute(insert(table), buf)
+            n += len(buf)
+    return n
+
+def build_from_pois() -> int:
+    """(Re)build the 'poi' gazetteer slice from centroids of cached POI rows, one per city."""
+    with SessionLocal() as db:
+        cities = db.execute(
+            select(POI.city, func.avg(POI.lat), func.avg(POI.lon), func.count()).group_by(POI.city)
+        ).all()
+    rows = []
+    for city, lat, lon, count in cities:
+        name, qualifiers = _split(city)
+        if name and lat is not None:
+            rows.append({"name": name, "admin": qualifiers[0] if qualifiers else None,
+                         "lat": lat, "lon": lon, "population": count})
+    with engine.begin() as conn:
+        conn.execute(delete(GazetteerEntry.__table__).where(GazetteerEntry.source == "poi"))
+    return import_rows(rows, "poi")
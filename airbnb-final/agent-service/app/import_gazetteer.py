@@ -0,0 +1,64 @@
+"""Bulk-load the offline gazetteer used by geocode_city.
+
+    python -m app.import_gazetteer cities1000.txt        # GeoNames dump (tab-separated)
+    python -m app.import_gazetteer places.csv            # CSV header: name,lat,lon[,admin,country,population]
+    python -m app.import_gazetteer --from-pois           # centroids of cached POI rows per city
+"""
+from __future__ import annotations
+import argparse
+import csv
+import sys
+from typing import Iterator
+
+from sqlalchemy import delete
+
+from .db import engine
+from .geocoder import import_rows, build_from_pois
+from .utils import normalize
+from .init_db import ensure_schema
+from .models import GazetteerEntry
+
+csv.field_size_limit(sys.maxsize)
+
+# https://download.geonames.org/export/dump/readme.txt
+GN_NAME, GN_ASCII, GN_LAT, GN_LON, GN_COUNTRY, GN_ADMIN1, GN_POP = 1, 2, 4, 5, 8, 10, 14
+
+def geonames_rows(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8", newline="") as f:
+        for cols in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(cols) <= GN_POP:
+                continue
+            base = {"lat": cols[GN_LAT], "lon": cols[GN_LON], "country": cols[GN_COUNTRY],
+                    "admin": cols[GN_ADMIN1], "population": cols[GN_POP] or 0}
+            yield {**base, "name": cols[GN_NAME]}
+            if normalize(cols[GN_ASCII]) != normalize(cols[GN_NAME]):
+                yield {**base, "name": cols[GN_ASCII]}
+
+def csv_rows(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", nargs="?", help="GeoNames .txt/.tsv dump or CSV file")
+    ap.add_argument("--source", help="tag for imported rows (default: geonames or csv)")
+    ap.add_argument("--replace", action="store_true", help="drop existing rows with the same source first")
+    ap.add_argument("--from-pois", action="store_true", help="rebuild the POI-centroid slice")
+    args = ap.parse_args(argv)
+    if not args.path and not args.from_pois:
+        ap.error("give a file to import and/or --from-pois")
+
+    ensure_schema()
+    if args.path:
+        is_geonames = args.path.endswith((".txt", ".tsv"))
+        source = args.source or ("geonames" if is_geonames else "csv")
+        if args.replace:
+            with engine.begin() as conn:
+                conn.execute(delete(GazetteerEntry.__table__).where(GazetteerEntry.source == source))
+        n = import_rows(geonames_rows(args.path) if is_geonames else csv_rows(args.path), source)
+        print(f"✅ Imported {n} gazetteer rows from {args.path} ({source}).")
+    if args.from_pois:
+        print(f"✅ Built {build_from_pois()} gazetteer rows from POI centroids.")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,81 @@
+from sqlalchemy import inspect, select, text, update, delete, bindparam, func
+
 from .db import engine
-from .models import Base
+from .geo import cell_id
+from .models import Base, GeoMixin, POI, PoiTag, PlanRun, poi_tag_rows
+from . import blobs
 
-if __name__ == "__main__":
+def _add_missing_columns(conn):
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing:
+                continue
+            ddl = col.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl}"))
+        indexed = {i["name"] for i in insp.get_indexes(table.name)}
+        for idx in table.indexes:
+            if idx.name in indexed:
+                continue
+            if idx.unique:
+                _drop_duplicates(conn, table, list(idx.columns))
+            idx.create(bind=conn)
+
+def _drop_duplicates(conn, table, cols):
+    # keep the oldest row per key so a new unique index can be built (derived table keeps MySQL happy)
+    keep = select(func.min(table.c.id).label("id")).group_by(*cols).subquery()
+    conn.execute(delete(table).where(table.c.id.not_in(select(keep.c.id))))
+
+def _backfill_geocells(conn):
+    for mapper in Base.registry.mappers:
+        cls = mapper.class_
+        if not issubclass(cls, GeoMixin):
+            continue
+        t = cls.__table__
+        rows = conn.execute(select(t.c.id, t.c.lat, t.c.lon).where(t.c.geocell.is_(None))).all()
+        if rows:
+            conn.execute(
+                update(t).where(t.c.id == bindparam("_id")).values(geocell=bindparam("_cell")),
+                [{"_id": r.id, "_cell": cell_id(r.lat, r.lon)} for r in rows],
+            )
+
+def _backfill_poi_tags(conn):
+    pois = POI.__table__
+    rows = conn.execute(select(pois.c.id, pois.c.tags)).all()
+    tag_rows = [t for r in rows for t in poi_tag_rows(r.id, r.tags)]
+    if tag_rows:
+        conn.execute(PoiTag.__table__.insert(), tag_rows)
+
+def _backfill_plan_blobs(conn, batch: int = 500):
+    """Move legacy inline plan_runs.result_json payloads into plan_blobs."""
+    t = PlanRun.__table__
+    last = 0
+    while True:
+        rows = conn.execute(
+            select(t.c.id, t.c.result_json).where(t.c.result_hash.is_(None), t.c.id > last).order_by(t.c.id).limit(batch)
+        ).all()
+        if not rows:
+            return
+        last = rows[-1].id
+        moved = [{"_id": r.id, "_hash": blobs.put(conn, r.result_json)} for r in rows if r.result_json]
+        if moved:
+            conn.execute(
+                update(t).where(t.c.id == bindparam("_id")).values(result_hash=bindparam("_hash"), result_json=None),
+                moved,
+            )
+
+def ensure_schema():
+    """create_all plus the additive bits it can't do on existing tables (demo-safe; use Alembic in prod)."""
+    had_tables = set(inspect(engine).get_table_names())
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _add_missing_columns(conn)
+        _backfill_geocells(conn)
+        if PoiTag.__tablename__ not in had_tables:
+            _backfill_poi_tags(conn)
+        _backfill_plan_blobs(conn)
+
+if __name__ == "__main__":
+    ensure_schema()
     print("✅ Database tables created.")
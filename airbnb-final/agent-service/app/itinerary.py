@@ -0,0 +1,121 @@
+"""Itinerary engine: one geographic cluster per day, stops in travel order.
+
+Candidates are clustered with k-means (k = number of days) on a local
+equirectangular projection. Each day takes the unused candidates closest
+(haversine) to its centroid; the pool is only repeated once every candidate
+has been used. Stops within a day are ordered nearest-neighbour from the
+trip origin, then improved with 2-opt. Everything is vectorized, so pools of
+thousands of candidates cost a few milliseconds.
+"""
+from __future__ import annotations
+import math
+import random
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .geo import EARTH_RADIUS_KM
+
+KMEANS_ITERS = 50
+KMEANS_TOL_KM = 0.05
+KMEANS_SAMPLE = 2048               # centroids are fitted on at most this many points
+
+def haversine_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise km between (n, 2) and (m, 2) arrays of (lat, lon) degrees -> (n, m)."""
+    a, b = np.radians(a), np.radians(b)
+    dlat = a[:, None, 0] - b[None, :, 0]
+    dlon = a[:, None, 1] - b[None, :, 1]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[:, None, 0]) * np.cos(b[None, :, 0]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+def _coords(items: Sequence[Dict], origin: Tuple[float, float]) -> np.ndarray:
+    """Item geos as an array; missing / (0, 0) geos sit at the origin."""
+    pts = np.array([tuple(it.get("geo") or (0.0, 0.0))[:2] for it in items], dtype=float).reshape(-1, 2)
+    pts[(pts == 0.0).all(axis=1)] = origin
+    return pts
+
+def _km_per_deg(pts: np.ndarray) -> np.ndarray:
+    """(lat, lon) km-per-degree around the pool's mean latitude; haversine-accurate at city scale."""
+    k = math.radians(1) * EARTH_RADIUS_KM
+    return np.array([k, k * math.cos(math.radians(pts[:, 0].mean()))])
+
+def kmeans(pts: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Centroids (k, 2) in lat/lon via k-means++ seeding and Lloyd iterations on projected km."""
+    if len(pts) > KMEANS_SAMPLE:
+        pts = pts[rng.choice(len(pts), KMEANS_SAMPLE, replace=False)]
+    scale = _km_per_deg(pts)
+    xy = pts * scale
+    centers = xy[[rng.integers(len(xy))]]
+    d2 = ((xy - centers[0]) ** 2).sum(axis=1)
+    while len(centers) < k:
+        total = d2.sum()
+        nxt = rng.choice(len(xy), p=d2 / total) if total > 0 else rng.integers(len(xy))
+        centers = np.vstack([centers, xy[nxt]])
+        d2 = np.minimum(d2, ((xy - xy[nxt]) ** 2).sum(axis=1))
+    for _ in range(KMEANS_ITERS):
+        # |x - c|^2 minus the per-point |x|^2 term, which does not change the argmin
+        labels = ((centers ** 2).sum(axis=1) - 2 * xy @ centers.T).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        moved = centers.copy()
+        for axis in (0, 1):
+            sums = np.bincount(labels, weights=xy[:, axis], minlength=k)
+            moved[:, axis] = np.where(counts > 0, sums / np.maximum(counts, 1), centers[:, axis])
+        shift = np.abs(moved - centers).max()
+        centers = moved
+        if shift < KMEANS_TOL_KM:
+            break
+    return centers / scale
+
+def route(pts: np.ndarray, origin: Tuple[float, float]) -> List[int]:
+    """Visiting order for ``pts`` as an open path from ``origin``: nearest neighbour, then 2-opt."""
+    n = len(pts)
+    if n < 2:
+        return list(range(n))
+    nodes = np.vstack([origin, pts])
+    d = haversine_matrix(nodes, nodes)
+    path, left = [0], set(range(1, n + 1))
+    while left:
+        row = d[path[-1]]
+        nxt = min(left, key=lambda j: row[j])
+        path.append(nxt)
+        left.remove(nxt)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n):
+            for j in range(i + 1, n + 1):
+                before = d[path[i - 1], path[i]] + (d[path[j], path[j + 1]] if j < n else 0.0)
+                after = d[path[i - 1], path[j]] + (d[path[i], path[j + 1]] if j < n else 0.0)
+                if after < before - 1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+    return [p - 1 for p in path[1:]]
+
+def plan_days(pool: Sequence[Dict], n_days: int, per_day: int, origin: Tuple[float, float],
+              rng: random.Random) -> List[List[Dict]]:
+    """``n_days`` lists of up to ``per_day`` items, each a compact, ordered cluster."""
+    if not pool or n_days <= 0:
+        return [[] for _ in range(max(n_days, 0))]
+    pts = _coords(pool, origin)
+    centroids = kmeans(pts, min(n_days, len(pool)), np.random.default_rng(rng.getrandbits(64)))
+    to_centroid = haversine_matrix(pts, centroids)
+    used = np.zeros(len(pool), dtype=bool)
+    days: List[List[Dict]] = []
+    for day in range(n_days):
+        dist = to_centroid[:, day % len(centroids)]
+        take: List[int] = []
+        while len(take) < per_day:
+            if used.all():
+                # start another pass over the pool, but never repeat a stop within a day
+                used[:] = False
+                used[take] = True
+                if used.all():
+                    break
+            free = np.flatnonzero(~used)
+            want = min(per_day - len(take), len(free))
+            near = free[np.argpartition(dist[free], want - 1)[:want]]
+            pick = near[np.argsort(dist[near], kind="stable")]
+            used[pick] = True
+            take.extend(pick.tolist())
+        days.append([pool[take[i]] for i in route(pts[take], origin)])
+    return days
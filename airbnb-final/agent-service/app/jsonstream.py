@@ -0,0 +1,50 @@
+"""Incremental reading of one top-level JSON array from a streamed body.
+
+``aitems(chunks, "elements")`` yields the items of ``"elements": [...]`` as
+each one is complete, so a caller can stop reading whenever it has enough;
+memory is the current item plus one chunk, not the whole document. Built on
+the stdlib decoder's ``raw_decode``: the items are ordinary json values.
+Anything after the array is not read.
+"""
+from __future__ import annotations
+import json
+import re
+from typing import Any, AsyncIterator
+
+_DECODER = json.JSONDecoder()
+_SKIP = re.compile(r"[\s,]*")
+_ENDS = frozenset(" \t\r\n,]")
+_TAIL = 64          # kept while looking for the key, in case it straddles two chunks
+_COMPACT_AT = 1 << 16
+
+async def aitems(chunks: AsyncIterator[str], key: str) -> AsyncIterator[Any]:
+    """Items of the first array under `key`, in order. ValueError if the body ends inside it."""
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buf, pos = "", None
+    async for chunk in chunks:
+        buf += chunk
+        if pos is None:
+            m = start.search(buf)
+            if m is None:
+                buf = buf[-_TAIL:]
+                continue
+            pos = m.end()
+        while True:
+            pos = _SKIP.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = _DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # item not complete yet
+            if not isinstance(item, (dict, list, str)) and (end == len(buf) or buf[end] not in _ENDS):
+                break  # a number cut by the chunk boundary ("2." of "2.5"): wait for the rest
+            pos = end
+            yield item
+        if pos > _COMPACT_AT:
+            buf, pos = buf[pos:], 0
+    if pos is None:
+        return
+    raise ValueError(f"body ended inside the {key!r} array")
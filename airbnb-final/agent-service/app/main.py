@@ -1,19 +1,43 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
+from typing import List
 import logging, traceback
+import orjson
 
-from .db import get_db, engine
-from .models import Base, Booking, Preference, PlanRun
-from .schemas import AgentRequest, AgentResponse, PlanResponse
-from .agent import build_plan
+from .db import AsyncSessionLocal, get_adb, async_engine
+from .init_db import ensure_schema
+from .models import Booking, Preference, PlanRun
+from .config import settings
+from .schemas import (
+    AgentRequest, AgentResponse, BatchItemResult, BatchResponse, DayPlan, PlanResponse, RestaurantCard,
+)
+from .agent import abuild_plan, abuild_plans, astream_plan
+from . import blobs, deadline, metrics
+from .cache import LRU, cache_stats
+from .catalog import CATALOG
+from .retrieval import OVERPASS_MIRRORS
 
 logger = logging.getLogger("uvicorn.error")
 
+_RUN_LRU = LRU(settings.plan_run_lru_size)  # run_id -> stored output JSON; runs never change
+
 # Ensure tables (demo-safe; use Alembic in prod)
-Base.metadata.create_all(bind=engine)
+ensure_schema()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.in_memory_catalog:
+        CATALOG.refresh()
+    yield
+    await async_engine.dispose()
 
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     title="AI Concierge Agent",
     version="1.0.0",
     description="""
@@ -23,7 +47,7 @@ Agent that converts booking + preferences + live context into:
 - Dietary-filtered restaurants
 - Weather-aware packing checklist
 
-Test at **POST /agent/plan**. Swagger is this page.
+Test at **POST /agent/plan** (or **POST /agent/plan/stream** for NDJSON stages). Swagger is this page.
 """
 )
 
@@ -31,6 +55,8 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"], allow_credentials=True
 )
+app.add_middleware(metrics.ServerTimingMiddleware)
+app.add_middleware(deadline.DeadlineMiddleware)
 
 @app.get("/")
 def index():
@@ -40,43 +66,152 @@ def index():
 def health():
     return {"ok": True, "env": "development"}
 
+@app.get("/cache/stats")
+def cache_stats_view():
+    return cache_stats()
+
+@app.get("/overpass/mirrors")
+def overpass_mirrors():
+    return OVERPASS_MIRRORS.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_view():
+    """Prometheus text format: stage/request histograms, cache and fallback counters, mirror health."""
+    return PlainTextResponse(metrics.render(OVERPASS_MIRRORS.snapshot()), media_type="text/plain; version=0.0.4")
+
+_PLAN_JSON = TypeAdapter(PlanResponse)
+
+def _validate(output: dict) -> PlanResponse:
+    with metrics.span("validate"):
+        return PlanResponse.model_validate(output)
+
+def _render(result: PlanResponse) -> bytes:
+    """The plan's JSON, serialized once: these bytes are both stored and sent."""
+    with metrics.span("serialize"):
+        return _PLAN_JSON.dump_json(result)
+
+def _with_output(head: dict, raw: bytes) -> bytes:
+    """JSON of `head` plus an "output" member holding already-rendered plan JSON."""
+    return orjson.dumps(head)[:-1] + b',"output":' + raw + b"}"
+
+def _json(body: bytes) -> Response:
+    # response_model only documents these endpoints; the body is already valid and serialized
+    return Response(body, media_type="application/json")
+
+@metrics.timed("db")
+async def _log_run(db: AsyncSession, req: AgentRequest, result: PlanResponse, raw: bytes) -> PlanRun:
+    """Persist booking/preference and the run; commits."""
+    booking = Booking(
+        start_date=req.booking.start_date,
+        end_date=req.booking.end_date,
+        location=req.booking.location,
+        party_type=req.booking.party_type
+    )
+    db.add(booking); await db.flush()
+
+    pref = Preference(
+        budget_tier=req.preferences.budget_tier,
+        interests=",".join(req.preferences.interests),
+        mobility=req.preferences.mobility or None,
+        dietary=req.preferences.dietary or None
+    )
+    db.add(pref); await db.flush()
+
+    result_hash = await db.run_sync(lambda s: blobs.put_raw(s, raw))
+    run = PlanRun(
+        booking_id=booking.id,
+        preference_id=pref.id,
+        user_query=req.ask or "",
+        weather_summary=result.weather_summary,
+        result_json=None,
+        result_hash=result_hash,
+    )
+    db.add(run); await db.commit()
+    _RUN_LRU.put(run.id, raw)
+    return run
+
+@app.get("/agent/plan/{run_id}", response_model=AgentResponse)
+async def get_plan(run_id: int, db: AsyncSession = Depends(get_adb)):
+    raw = _RUN_LRU.get(run_id)
+    if raw is None:
+        run = await db.get(PlanRun, run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail=f"No plan run {run_id}")
+        if run.result_hash:
+            raw = await db.run_sync(lambda s: blobs.get_raw(s, run.result_hash))
+        elif run.result_json:
+            raw = orjson.dumps(run.result_json)
+        if raw is None:
+            raise HTTPException(status_code=404, detail=f"Plan run {run_id} has no stored result")
+        _RUN_LRU.put(run_id, raw)
+    return _json(_with_output({"run_id": run_id}, raw))
+
 @app.post("/agent/plan", response_model=AgentResponse)
-def plan(req: AgentRequest, db: Session = Depends(get_db)):
+async def plan(req: AgentRequest, db: AsyncSession = Depends(get_adb)):
     try:
-        # persist booking/preference
-        booking = Booking(
-            start_date=req.booking.start_date,
-            end_date=req.booking.end_date,
-            location=req.booking.location,
-            party_type=req.booking.party_type
-        )
-        db.add(booking); db.flush()
-
-        pref = Preference(
-            budget_tier=req.preferences.budget_tier,
-            interests=",".join(req.preferences.interests),
-            mobility=req.preferences.mobility or None,
-            dietary=req.preferences.dietary or None
-        )
-        db.add(pref); db.flush()
-
-        # build plan
-        output: dict = build_plan(req.booking, req.preferences, req.ask, db)
-        result = PlanResponse.model_validate(output)
-
-        # log run
-        run = PlanRun(
-            booking_id=booking.id,
-            preference_id=pref.id,
-            user_query=req.ask or "",
-            weather_summary=result.weather_summary,
-            result_json=result.model_dump()
-        )
-        db.add(run); db.commit(); db.refresh(run)
-
-        return AgentResponse(run_id=run.id, output=result)
+        # build plan first (external lookups fan out concurrently), so no write
+        # transaction is held open while we wait on the network
+        output: dict = await abuild_plan(req.booking, req.preferences, req.ask, db)
+        result = _validate(output)
+        raw = _render(result)
+        run = await _log_run(db, req, result, raw)
+        return _json(_with_output({"run_id": run.id}, raw))
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error("plan() failed: %s\n%s", e, traceback.format_exc())
         raise HTTPException(status_code=400, detail=f"Agent error: {e}")
+
+@app.post("/agent/plan/batch", response_model=BatchResponse)
+async def plan_batch(reqs: List[AgentRequest], db: AsyncSession = Depends(get_adb)):
+    """Many plans at once; lookups are shared across requests for the same location.
+    Per-item failures come back as `error` and don't fail the batch."""
+    if len(reqs) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_items} items per batch")
+    outputs = await abuild_plans([(r.booking, r.preferences, r.ask) for r in reqs], db)
+    results = []
+    for i, (req, output) in enumerate(zip(reqs, outputs)):
+        try:
+            if isinstance(output, Exception):
+                raise output
+            result = _validate(output)
+            raw = _render(result)
+            run = await _log_run(db, req, result, raw)
+            results.append(_with_output({"index": i, "run_id": run.id, "error": None}, raw))
+        except Exception as e:
+            await db.rollback()
+            logger.error("plan_batch() item %d failed: %s", i, e)
+            results.append(orjson.dumps(BatchItemResult(index=i, error=f"Agent error: {e}").model_dump()))
+    return _json(b'{"results":[' + b",".join(results) + b"]}")
+
+_STAGE_MODELS = {"restaurants": TypeAdapter(List[RestaurantCard]), "day": TypeAdapter(DayPlan)}
+
+def _ndjson(stage: str, data) -> bytes:
+    return orjson.dumps({"stage": stage, "data": data}, default=str) + b"\n"
+
+@app.post("/agent/plan/stream")
+async def plan_stream(req: AgentRequest):
+    """NDJSON, one {"stage", "data"} object per line as each part of the plan is ready:
+    "weather" (summary + packing list), "restaurants", one "day" per date, "notes",
+    then "done" with the run_id once the PlanRun is written ("error" if anything fails).
+    """
+    async def lines():
+        # own session: a yield-dependency would be closed before the body streams
+        async with AsyncSessionLocal() as db:
+            try:
+                async for stage, payload in astream_plan(req.booking, req.preferences, req.ask, db):
+                    if stage == "plan":
+                        result = _validate(payload)
+                        run = await _log_run(db, req, result, _render(result))
+                        yield _ndjson("done", {"run_id": run.id})
+                        continue
+                    if stage in _STAGE_MODELS:
+                        with metrics.span("validate"):
+                            payload = _STAGE_MODELS[stage].dump_python(_STAGE_MODELS[stage].validate_python(payload), mode="json")
+                    yield _ndjson(stage, payload)
+            except Exception as e:
+                await db.rollback()
+                logger.error("plan_stream() failed: %s\n%s", e, traceback.format_exc())
+                yield _ndjson("error", {"detail": f"Agent error: {e}"})
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
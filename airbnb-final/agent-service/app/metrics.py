@@ -0,0 +1,157 @@
+"""Per-stage timing spans, a Server-Timing header and a Prometheus /metrics page.
+
+``span("weather")`` (or ``@timed("weather")`` on a sync or async function)
+times a stage. Every span feeds the process-wide ``agent_stage_seconds``
+histogram; inside an HTTP request it is also collected for that request's
+``Server-Timing`` header. Spans taken in tasks and threads started by the
+request land in the same list, since both copy the request's context.
+Concurrent spans of one stage are summed in the header.
+
+Counters are not kept here: everything registered with
+``cache.register_stats`` (cache hits, geocode sources, fallbacks, ...) and
+the Overpass mirror stats are read at scrape time.
+"""
+from __future__ import annotations
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Tuple
+
+from .cache import cache_stats
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_SPANS: ContextVar[List[Tuple[str, float]] | None] = ContextVar("spans", default=None)
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, Prometheus style."""
+    def __init__(self, name: str, help_: str, label: str, buckets: Tuple[float, ...] = BUCKETS):
+        self.name, self.help, self.label, self.buckets = name, help_, label, buckets
+        self._series: Dict[str, List] = {}  # label -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: str, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            s = self._series.setdefault(value, [0] * len(self.buckets) + [0.0, 0])
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += seconds
+            s[-1] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for value, s in sorted(series.items()):
+            lbl = f'{self.label}="{_escape(value)}"'
+            acc = 0
+            for le, n in zip(self.buckets, s):
+                acc += n
+                yield f'{self.name}_bucket{{{lbl},le="{le}"}} {acc}'
+            yield f'{self.name}_bucket{{{lbl},le="+Inf"}} {s[-1]}'
+            yield f"{self.name}_sum{{{lbl}}} {s[-2]:.6f}"
+            yield f"{self.name}_count{{{lbl}}} {s[-1]}"
+
+STAGE_SECONDS = Histogram("agent_stage_seconds", "Time spent per plan stage.", "stage")
+REQUEST_SECONDS = Histogram("agent_request_seconds", "HTTP request time to the last body byte.", "endpoint")
+_RESPONSES: Dict[Tuple[str, int], int] = {}
+_RESPONSES_LOCK = threading.Lock()
+
+def record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(stage, seconds)
+    spans = _SPANS.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+@contextmanager
+def span(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+def timed(stage: str):
+    """Decorator form of span() for sync and async functions."""
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def inner(*a, **kw):
+                with span(stage):
+                    return await fn(*a, **kw)
+        else:
+            @functools.wraps(fn)
+            def inner(*a, **kw):
+                with span(stage):
+                    return fn(*a, **kw)
+        return inner
+    return wrap
+
+def server_timing(spans: List[Tuple[str, float]], total_s: float) -> str:
+    by_stage: Dict[str, float] = {}
+    for stage, seconds in spans:
+        by_stage[stage] = by_stage.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in by_stage.items()]
+    return ", ".join(parts + [f"total;dur={total_s * 1000:.1f}"])
+
+class ServerTimingMiddleware:
+    """Pure ASGI (so streamed bodies pass through untouched). The header carries the spans
+    finished when the response starts; for /agent/plan/stream that is before the first stage."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        spans: List[Tuple[str, float]] = []
+        token = _SPANS.set(spans)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(spans, time.perf_counter() - t0).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _SPANS.reset(token)
+            endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            REQUEST_SECONDS.observe(endpoint, time.perf_counter() - t0)
+            with _RESPONSES_LOCK:
+                _RESPONSES[(endpoint, status)] = _RESPONSES.get((endpoint, status), 0) + 1
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render(mirror_snapshot: List[dict] = ()) -> str:
+    """The whole exposition page (text format 0.0.4)."""
+    lines = [*STAGE_SECONDS.render(), *REQUEST_SECONDS.render()]
+    lines += ["# HELP agent_responses_total HTTP responses by endpoint and status.",
+              "# TYPE agent_responses_total counter"]
+    with _RESPONSES_LOCK:
+        responses = sorted(_RESPONSES.items())
+    lines += [f'agent_responses_total{{endpoint="{e}",status="{s}"}} {n}' for (e, s), n in responses]
+    lines += ["# HELP agent_events_total Cache, geocode, parse and fallback counters by namespace.",
+              "# TYPE agent_events_total counter"]
+    for ns, counts in sorted(cache_stats().items()):
+        lines += [f'agent_events_total{{namespace="{ns}",event="{_escape(k)}"}} {v}' for k, v in sorted(counts.items())]
+    for field, kind, help_ in (("requests", "counter", "Requests sent to each Overpass mirror."),
+                               ("errors", "counter", "Failed requests per Overpass mirror."),
+                               ("wins", "counter", "Hedged races won per Overpass mirror."),
+                               ("open", "gauge", "1 while the mirror's circuit breaker is open.")):
+        name = f"overpass_mirror_{field}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help_}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{url="{_escape(m["url"])}"}} {int(m[field])}' for m in mirror_snapshot]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,119 @@
+"""Hedged requests across equivalent HTTP mirrors.
+
+The primary (fastest healthy) mirror is asked first; if it hasn't answered
+within ``hedge_delay_s`` -- or fails -- the next one is asked as well, and so
+on. The first non-empty answer wins and the remaining requests are cancelled.
+
+Each mirror keeps a latency EWMA (used for ordering) and a consecutive-failure
+circuit breaker: after ``fail_threshold`` failures it is skipped for
+``cooldown_s``, then allowed one probe again.
+
+``extract`` gets the response with its body still streaming, so it can read
+as much of it as it needs; the connection is closed when it returns.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+@dataclass
+class MirrorState:
+    url: str
+    ewma_s: float | None = None
+    failures: int = 0
+    open_until: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    wins: int = 0
+
+class MirrorPool:
+    def __init__(self, urls: List[str], hedge_delay_s: float, timeout_s: float,
+                 fail_threshold: int = 3, cooldown_s: float = 60.0, alpha: float = 0.3):
+        self.hedge_delay_s = hedge_delay_s
+        self.timeout_s = timeout_s
+        self.fail_threshold = fail_threshold
+        self.cooldown_s = cooldown_s
+        self.alpha = alpha
+        self.mirrors: Dict[str, MirrorState] = {u: MirrorState(u) for u in urls}
+
+    def ordered(self) -> List[str]:
+        """Healthy mirrors, fastest first (unmeasured ones keep config order after measured ones).
+        If every breaker is open, all mirrors are returned, soonest-to-close first."""
+        now = time.monotonic()
+        rank = {u: i for i, u in enumerate(self.mirrors)}
+        healthy = [m for m in self.mirrors.values() if m.open_until <= now]
+        if not healthy:
+            return [m.url for m in sorted(self.mirrors.values(), key=lambda m: m.open_until)]
+        healthy.sort(key=lambda m: (m.ewma_s is None, m.ewma_s or 0.0, rank[m.url]))
+        return [m.url for m in healthy]
+
+    def _record(self, url: str, elapsed_s: float | None) -> None:
+        m = self.mirrors[url]
+        m.requests += 1
+        if elapsed_s is None:
+            m.errors += 1
+            m.failures += 1
+            if m.failures >= self.fail_threshold:
+                m.open_until = time.monotonic() + self.cooldown_s
+            return
+        m.failures = 0
+        m.open_until = 0.0
+        m.ewma_s = elapsed_s if m.ewma_s is None else self.alpha * elapsed_s + (1 - self.alpha) * m.ewma_s
+
+    async def _one(self, client: httpx.AsyncClient, url: str, data: dict,
+                   extract: Callable[[httpx.Response], Awaitable[list]]) -> list:
+        t0 = time.monotonic()
+        try:
+            async with client.stream("POST", url, data=data) as r:
+                r.raise_for_status()
+                out = await extract(r)
+        except Exception:
+            self._record(url, None)
+            return []
+        self._record(url, time.monotonic() - t0)
+        return out
+
+    async def post(self, data: dict, extract: Callable[[httpx.Response], Awaitable[list]]) -> list:
+        """POST ``data`` with hedging; returns the first non-empty ``await extract(response)``, else []."""
+        queue = self.ordered()
+        pending: Dict[asyncio.Task, str] = {}
+        async with httpx.AsyncClient(timeout=self.timeout_s) as client:
+            try:
+                while queue or pending:
+                    # every wake-up is either the hedge timer or a finished loser: bring in the next mirror
+                    if queue:
+                        url = queue.pop(0)
+                        pending[asyncio.create_task(self._one(client, url, data, extract))] = url
+                    done, _ = await asyncio.wait(
+                        pending, timeout=self.hedge_delay_s if queue else None,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    for task in done:
+                        url = pending.pop(task)
+                        out = task.result()
+                        if out:
+                            self.mirrors[url].wins += 1
+                            return out
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        return []
+
+    def snapshot(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": m.url,
+                "ewma_ms": round(m.ewma_s * 1000, 1) if m.ewma_s is not None else None,
+                "open": m.open_until > now,
+                "consecutive_failures": m.failures,
+                "requests": m.requests,
+                "errors": m.errors,
+                "wins": m.wins,
+            }
+            for m in self.mirrors.values()
+        ]
@@ -1,11 +1,70 @@
 from __future__ import annotations
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, Date, DateTime, Text, Float, ForeignKey, JSON, func
+from sqlalchemy import String, Integer, Date, DateTime, Text, Float, ForeignKey, JSON, Index, LargeBinary, func, event, select, update
 from datetime import date, datetime
+import math
+
+from .geo import haversine_km, cell_id, bbox, cells_for_bbox
+from .utils import split_tags
 
 class Base(DeclarativeBase):
     pass
 
+class GeoMixin:
+    """Grid-cell column + radius lookup for tables with lat/lon."""
+    geocell: Mapped[int | None] = mapped_column(Integer, index=True, nullable=True)
+
+    @classmethod
+    def near_query(cls, lat: float, lon: float, radius_km: float, limit: int | None = None, columns=()):
+        """`columns` (all of them by default) of rows in the bounding box, nearest first by a flat-earth
+        estimate so the database sorts and applies `limit`; only that many rows leave it."""
+        min_lat, max_lat, min_lon, max_lon = bbox(lat, lon, radius_km)
+        cols = [getattr(cls, c) for c in dict.fromkeys([*columns, "lat", "lon"])] if columns else [cls.__table__]
+        kx = math.cos(math.radians(lat)) ** 2  # squared degrees of longitude per degree of latitude, here
+        q = (select(*cols)
+             .where(cls.lat.between(min_lat, max_lat), cls.lon.between(min_lon, max_lon))
+             .order_by((cls.lat - lat) * (cls.lat - lat) + (cls.lon - lon) * (cls.lon - lon) * kx)
+             .limit(limit))
+        cells = cells_for_bbox(min_lat, max_lat, min_lon, max_lon)
+        if cells is not None:
+            q = q.where(cls.geocell.in_(cells))
+        return q
+
+    @classmethod
+    def near(cls, session, lat: float, lon: float, radius_km: float, limit: int | None = None, where=(),
+             columns=()):
+        """Rows (`columns` only) within radius_km of (lat, lon) matching `where`, nearest first."""
+        rows = session.execute(cls.near_query(lat, lon, radius_km, limit, columns).where(*where)).all()
+        return _within(rows, lat, lon, radius_km, limit)
+
+    @classmethod
+    async def anear(cls, session, lat: float, lon: float, radius_km: float, limit: int | None = None, where=(),
+                    columns=()):
+        """`near` on an AsyncSession."""
+        rows = (await session.execute(cls.near_query(lat, lon, radius_km, limit, columns).where(*where))).all()
+        return _within(rows, lat, lon, radius_km, limit)
+
+def _within(rows, lat: float, lon: float, radius_km: float, limit: int | None):
+    """The exact cut: haversine radius and order over the (already limited) rows."""
+    hits = []
+    for r in rows:
+        d = haversine_km(lat, lon, r.lat, r.lon)
+        if d <= radius_km:
+            hits.append((d, r))
+    hits.sort(key=lambda h: h[0])
+    return [r for _, r in hits[:limit]]
+
+def with_geocell(row: dict) -> dict:
+    """For Core/bulk inserts, which skip the ORM insert hook below."""
+    row["geocell"] = cell_id(row["lat"], row["lon"])
+    return row
+
+@event.listens_for(GeoMixin, "before_insert", propagate=True)
+@event.listens_for(GeoMixin, "before_update", propagate=True)
+def _set_geocell(mapper, connection, target):
+    if target.lat is not None and target.lon is not None:
+        target.geocell = cell_id(target.lat, target.lon)
+
 class Booking(Base):
     __tablename__ = "bookings"
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
@@ -30,11 +89,23 @@ class PlanRun(Base):
     preference_id: Mapped[int] = mapped_column(ForeignKey("preferences.id"))
     user_query: Mapped[str] = mapped_column(Text, default="")
     weather_summary: Mapped[str] = mapped_column(Text, default="")
-    result_json: Mapped[dict] = mapped_column(JSON)
+    # legacy inline payload; new runs point at a PlanBlob instead (and store JSON null here)
+    result_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    result_hash: Mapped[str | None] = mapped_column(String(64), ForeignKey("plan_blobs.hash"), nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+class PlanBlob(Base):
+    """A plan payload stored once: sha256 of its canonical JSON -> compressed bytes (see blobs.py)."""
+    __tablename__ = "plan_blobs"
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    codec: Mapped[str] = mapped_column(String(8))
+    data: Mapped[bytes] = mapped_column(LargeBinary(16 * 1024 * 1024))  # MEDIUMBLOB on MySQL
+    size: Mapped[int] = mapped_column(Integer)          # uncompressed bytes
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
-class POI(Base):
+class POI(GeoMixin, Base):
     __tablename__ = "pois"
+    __table_args__ = (Index("uq_pois_name_city", "name", "city", unique=True),)
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(200))
     address: Mapped[str] = mapped_column(String(200))
@@ -47,8 +118,33 @@ class POI(Base):
     child_friendly: Mapped[int] = mapped_column(Integer, default=1)
     city: Mapped[str] = mapped_column(String(120))
 
-class Restaurant(Base):
+class PoiTag(Base):
+    """One row per (POI, normalized tag): lets interest filters run as an indexed IN."""
+    __tablename__ = "poi_tags"
+    __table_args__ = (Index("ix_poi_tags_tag_poi", "tag", "poi_id"),)
+    poi_id: Mapped[int] = mapped_column(ForeignKey("pois.id", ondelete="CASCADE"), primary_key=True)
+    tag: Mapped[str] = mapped_column(String(60), primary_key=True)
+
+def poi_tag_rows(poi_id: int, tags: str) -> list[dict]:
+    return [{"poi_id": poi_id, "tag": t[:60]} for t in split_tags(tags)]
+
+def index_poi_tags(session, city: str, names: list[str]) -> None:
+    """Tag rows for bulk-inserted POIs (the ORM hook below only sees session.add)."""
+    from .db import insert_ignore
+    if not names:
+        return
+    rows = session.execute(select(POI.id, POI.tags).where(POI.city == city, POI.name.in_(names))).all()
+    insert_ignore(session, PoiTag.__table__, [t for r in rows for t in poi_tag_rows(r.id, r.tags)])
+
+@event.listens_for(POI, "after_insert")
+def _index_poi_tags(mapper, connection, target):
+    rows = poi_tag_rows(target.id, target.tags)
+    if rows:
+        connection.execute(PoiTag.__table__.insert(), rows)
+
+class Restaurant(GeoMixin, Base):
     __tablename__ = "restaurants"
+    __table_args__ = (Index("uq_restaurants_name_city", "name", "city", unique=True),)
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(200))
     address: Mapped[str] = mapped_column(String(200))
@@ -57,3 +153,63 @@ class Restaurant(Base):
     tags: Mapped[str] = mapped_column(String(200))
     price_tier: Mapped[str] = mapped_column(String(10), default="$$")
     city: Mapped[str] = mapped_column(String(120))
+
+class CacheEntry(Base):
+    __tablename__ = "cache_entries"
+    namespace: Mapped[str] = mapped_column(String(40), primary_key=True)
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[dict | list] = mapped_column(JSON)
+    updated_at: Mapped[float] = mapped_column(Float)   # epoch seconds
+
+class Geocode(Base):
+    __tablename__ = "geocodes"
+    query: Mapped[str] = mapped_column(String(200), primary_key=True)   # normalized place text
+    lat: Mapped[float] = mapped_column(Float)
+    lon: Mapped[float] = mapped_column(Float)
+    source: Mapped[str] = mapped_column(String(20))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+class GazetteerEntry(Base):
+    __tablename__ = "gazetteer"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(200), index=True)           # normalized
+    admin: Mapped[str | None] = mapped_column(String(120), nullable=True)  # state / admin1 code
+    country: Mapped[str | None] = mapped_column(String(2), nullable=True)
+    lat: Mapped[float] = mapped_column(Float)
+    lon: Mapped[float] = mapped_column(Float)
+    population: Mapped[int] = mapped_column(Integer, default=0)
+    source: Mapped[str] = mapped_column(String(20))
+
+class WeatherDay(Base):
+    __tablename__ = "weather_days"
+    cell_lat: Mapped[int] = mapped_column(Integer, primary_key=True)   # round(lat / WEATHER_GRID_DEG)
+    cell_lon: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    tmax: Mapped[float | None] = mapped_column(Float, nullable=True)
+    tmin: Mapped[float | None] = mapped_column(Float, nullable=True)
+    precip: Mapped[float | None] = mapped_column(Float, nullable=True)
+    fetched_at: Mapped[float] = mapped_column(Float)                   # epoch seconds
+
+class AreaVersion(Base):
+    """Bumped whenever cached places are written in a grid cell; the plan-cache key sums the cells a plan's
+    radius covers. Places are picked by distance, not city name, so neither is the version."""
+    __tablename__ = "area_versions"
+    cell: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)   # geo.cell_id
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+async def aarea_version(session, lat: float, lon: float, radius_km: float) -> int:
+    """Grows with every write of places within radius_km of (lat, lon) (and a little beyond: whole cells)."""
+    cells = cells_for_bbox(*bbox(lat, lon, radius_km))
+    q = select(func.coalesce(func.sum(AreaVersion.version), 0))
+    if cells is not None:
+        q = q.where(AreaVersion.cell.in_(cells))
+    return int(await session.scalar(q))
+
+def touch_cells(session, cells) -> None:
+    """Invalidate cached plans drawing on any of `cells`; committed by the caller. Atomic, so concurrent bumps all count."""
+    from .db import insert_ignore
+    cells = sorted({c for c in cells if c is not None})
+    if not cells:
+        return
+    insert_ignore(session, AreaVersion.__table__, [{"cell": c, "version": 0} for c in cells])
+    session.execute(update(AreaVersion).where(AreaVersion.cell.in_(cells)).values(version=AreaVersion.version + 1))
@@ -0,0 +1,141 @@
+"""Fill the geocode, weather, OSM and events caches ahead of upcoming trips.
+
+    python -m app.prewarm                                  # bookings starting in the next PREWARM_DAYS
+    python -m app.prewarm --days 14 --cities "Austin, TX" "Denver, CO"
+    python -m app.prewarm --cities-file seed_cities.txt --every 3600   # keep running, hourly
+
+Locations are warmed PREWARM_CONCURRENCY at a time; each gets one geocode,
+one weather fetch over all its trips, one OSM load (fetched and cached only
+when the DB has nothing near it) and one events lookup per trip.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select
+
+from .agent import _agroup_places
+from .config import settings
+from .db import AsyncSessionLocal, async_engine
+from .init_db import ensure_schema
+from .models import Booking
+from .retrieval import afetch_local_events
+from .utils import normalize
+from .weather import ageocode_city, adaily_weather
+
+Span = Tuple[date, date]
+
+async def upcoming_trips(days: int, today: date | None = None) -> Dict[str, List[Span]]:
+    """location -> distinct (start, end) of bookings starting within `days`."""
+    today = today or date.today()
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Booking.location, Booking.start_date, Booking.end_date)
+            .where(Booking.start_date.between(today, today + timedelta(days=days)))
+            .distinct()
+        )).all()
+    trips: Dict[str, List[Span]] = {}
+    for location, start, end in rows:
+        trips.setdefault(location, []).append((start, end))
+    return trips
+
+def _merge_targets(trips: Dict[str, List[Span]], cities: List[str], days: int, today: date) -> Dict[str, List[Span]]:
+    """Seed cities get the whole window; locations differing only in case/spacing are warmed once."""
+    merged: Dict[str, Tuple[str, set]] = {}
+    for location, spans in trips.items():
+        merged.setdefault(normalize(location), (location, set()))[1].update(spans)
+    for city in cities:
+        merged.setdefault(normalize(city), (city, set()))[1].add((today, today + timedelta(days=days)))
+    return {location: sorted(spans) for location, spans in merged.values()}
+
+async def warm_location(location: str, spans: List[Span]) -> Dict:
+    t0 = time.perf_counter()
+    report: Dict = {"location": location, "trips": len(spans), "errors": []}
+    lat, lon = await ageocode_city(location)
+    if (lat, lon) == (0.0, 0.0):
+        report["errors"].append("geocode: no match")
+    else:
+        start, end = min(s for s, _ in spans), max(e for _, e in spans)
+        weather, places, events = await asyncio.gather(
+            adaily_weather(lat, lon, start, end),
+            _agroup_places(location, lat, lon),
+            asyncio.gather(*(afetch_local_events(location, s.isoformat(), e.isoformat(), budget_s=None)
+                           for s, e in spans)),
+            return_exceptions=True,
+        )
+        for stage, out in (("weather", weather), ("places", places), ("events", events)):
+            if isinstance(out, Exception):
+                report["errors"].append(f"{stage}: {out}")
+        if not isinstance(weather, Exception):
+            report["weather_days"] = len((weather or {}).get("time") or [])
+        if not isinstance(places, Exception):
+            report["pois"], report["restaurants"] = sum(map(len, places[0].values())), len(places[1])
+        if not isinstance(events, Exception):
+            report["events"] = sum(len(e) for e in events)
+    report["seconds"] = round(time.perf_counter() - t0, 2)
+    return report
+
+async def run_once(days: int, cities: List[str], concurrency: int) -> Dict:
+    today = date.today()
+    targets = _merge_targets(await upcoming_trips(days, today), cities, days, today)
+    gate = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(location: str, spans: List[Span]) -> Dict:
+        async with gate:
+            try:
+                return await warm_location(location, spans)
+            except Exception as e:
+                return {"location": location, "trips": len(spans), "errors": [str(e)]}
+
+    t0 = time.perf_counter()
+    reports = await asyncio.gather(*(one(loc, spans) for loc, spans in targets.items()))
+    return {
+        "window_days": days,
+        "locations": len(reports),
+        "failed": sum(1 for r in reports if r["errors"]),
+        "seconds": round(time.perf_counter() - t0, 2),
+        "reports": sorted(reports, key=lambda r: r["location"]),
+    }
+
+def _print_report(run: Dict) -> None:
+    print(f"{'location':<32} {'trips':>5} {'wx days':>7} {'pois':>5} {'rests':>5} {'events':>6} {'sec':>6}  errors")
+    for r in run["reports"]:
+        print(f"{r['location'][:32]:<32} {r['trips']:>5} {r.get('weather_days', '-'):>7} {r.get('pois', '-'):>5} "
+              f"{r.get('restaurants', '-'):>5} {r.get('events', '-'):>6} {r.get('seconds', '-'):>6}  "
+              f"{'; '.join(r['errors'])}")
+    print(f"✅ Warmed {run['locations'] - run['failed']}/{run['locations']} locations "
+          f"(next {run['window_days']} days) in {run['seconds']}s.")
+
+async def _main(args) -> None:
+    cities = list(args.cities or [])
+    if args.cities_file:
+        with open(args.cities_file, encoding="utf-8") as f:
+            cities += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    try:
+        while True:
+            run = await run_once(args.days, cities, args.concurrency)
+            print(json.dumps(run, default=str)) if args.json else _print_report(run)
+            if not args.every:
+                break
+            await asyncio.sleep(args.every)
+    finally:
+        await async_engine.dispose()
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--days", type=int, default=settings.prewarm_days, help="warm trips starting within N days")
+    ap.add_argument("--cities", nargs="*", help="seed cities to warm for the whole window")
+    ap.add_argument("--cities-file", help="file with one seed city per line")
+    ap.add_argument("--concurrency", type=int, default=settings.prewarm_concurrency)
+    ap.add_argument("--every", type=float, help="repeat every N seconds instead of running once")
+    ap.add_argument("--json", action="store_true", help="print the run report as JSON")
+    args = ap.parse_args(argv)
+    ensure_schema()
+    asyncio.run(_main(args))
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,202 @@
 from typing import List, Dict, Tuple
+from collections import Counter
+from datetime import date, timedelta
+import asyncio
+import re
+import unicodedata
 import httpx
 from .config import settings
-from langchain_community.tools.tavily_search import TavilySearchResults
+from .geo import bbox, haversine_km
+from .cache import PersistentCache, make_key, register_stats
+from .utils import normalize
+from . import deadline, jsonstream
+from .metrics import timed
+from .mirrors import MirrorPool
 
 HTTP_TIMEOUT = 15.0
 
 # ---------- Optional: events via Tavily ----------
 
-def fetch_local_events(city: str, start_iso: str, end_iso: str) -> List[Dict]:
-    """Optional Tavily search for events. Returns [] if key missing or any error."""
-    if not settings.tavily_api_key:
-        return []
+_EVENTS_CACHE = PersistentCache("events", settings.events_cache_ttl_s)
+EVENT_STATS = register_stats("events_lookup", Counter(complete=0, partial=0, over_budget=0))
+_BACKGROUND: set = set()  # fills that outlived their request's budget
+
+def _weeks(start_iso: str, end_iso: str) -> List[Tuple[int, int, date]]:
+    """(ISO year, ISO week, Monday) of every week touched by [start, end]."""
+    start, end = date.fromisoformat(start_iso), date.fromisoformat(end_iso)
+    monday = start - timedelta(days=start.weekday())
+    out = []
+    while monday <= end:
+        year, week, _ = monday.isocalendar()
+        out.append((year, week, monday))
+        monday += timedelta(days=7)
+    return out
+
+def _events_key(city: str, year: int, week: int) -> str:
+    return make_key(normalize(city), year, week)
+
+def _events_query(city: str, monday: date) -> Dict:
+    # the body TavilySearchResults used to send, minus the wrapper (and its fixed endpoint)
+    return {"api_key": settings.tavily_api_key, "max_results": 5,
+            "query": f"events in {city} between {monday.isoformat()} and {(monday + timedelta(days=6)).isoformat()}"}
+
+@timed("tavily")
+async def _atavily_events(city: str, monday: date) -> List[Dict] | None:
+    """None on error: not cached, and not taken for a week without events."""
     try:
-        tool = TavilySearchResults(api_key=settings.tavily_api_key, max_results=5)
-        hits = tool.invoke({"query": f"events in {city} between {start_iso} and {end_iso}"}) or []
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            r = await client.post(settings.tavily_url, json=_events_query(city, monday))
+        r.raise_for_status()
+        hits = r.json().get("results") or []
     except Exception:
+        return None
+    return _hits_to_events(hits)
+
+def _stale_week(key: str) -> List[Dict] | None:
+    """A week still loading: its last cached answer however old, or None."""
+    hit = _EVENTS_CACHE.get(key)
+    return hit[0] if hit else None
+
+def _merge_weeks(weeks: List[List[Dict] | None]) -> List[Dict]:
+    """None marks a week without an answer in time."""
+    late = sum(w is None for w in weeks)
+    EVENT_STATS["complete" if not late else "over_budget" if late == len(weeks) else "partial"] += 1
+    if late:
+        deadline.degrade("events")
+    seen, out = set(), []
+    for e in (e for week in weeks for e in week or []):
+        if (e["name"], e["url"]) not in seen:
+            seen.add((e["name"], e["url"]))
+            out.append(e)
+    return out
+
+@timed("events")
+async def afetch_local_events(city: str, start_iso: str, end_iso: str,
+                              budget_s: float | None = settings.events_budget_s) -> List[Dict]:
+    """Optional Tavily search for events, cached per (city, ISO week); [] if the key is missing or on any error.
+
+    Weeks not answered within `budget_s` (or what is left of the request's
+    deadline) come from their expired cache entry if any, and keep filling the
+    cache in the background. None waits for everything.
+    """
+    if not settings.tavily_api_key:
         return []
+    weeks = _weeks(start_iso, end_iso)
+    keys = [_events_key(city, y, w) for y, w, _ in weeks]
+    tasks = [asyncio.create_task(_EVENTS_CACHE.aget_or_fetch(k, lambda m=m: _atavily_events(city, m)))
+             for k, (_, _, m) in zip(keys, weeks)]
+    done, pending = await asyncio.wait(tasks, timeout=None if budget_s is None else deadline.remaining(budget_s))
+    for t in pending:
+        _BACKGROUND.add(t)
+        t.add_done_callback(_BACKGROUND.discard)
+    weeks_out = [t.result() if t in done and not t.exception() else None for t in tasks]
+    for i in (i for i, t in enumerate(tasks) if t in pending):
+        weeks_out[i] = await asyncio.to_thread(_stale_week, keys[i])
+    for i in (i for i, t in enumerate(tasks) if t in done and weeks_out[i] is None):
+        deadline.fail("events")  # answered in time, but with an error and nothing cached to fall back on
+        weeks_out[i] = []
+    return _merge_weeks(weeks_out)
+
+def _hits_to_events(hits) -> List[Dict]:
     return [{"name": h.get("title", "Event"), "url": h.get("url", ""), "tags": ["event"]} for h in hits]
 
 
 # ---------- Places via OpenStreetMap (Overpass) with mirrors & widening ----------
 
 def _build_overpass_query(lat: float, lon: float, radius_m: int, filters: List[Tuple[str, str]]) -> str:
-    parts: List[str] = []
+    """One capped `out` per filter: Overpass emits in type/id order, so a shared cap would go to
+    whichever filter's elements come first (cafe nodes) and cut the rest (parks, mostly ways)."""
+    stmts: List[str] = []
     for key, regex in filters:
-        parts.append(f'node(around:{radius_m},{lat},{lon})[{key}~"{regex}"];')
-        parts.append(f'way(around:{radius_m},{lat},{lon})[{key}~"{regex}"];')
-        parts.append(f'relation(around:{radius_m},{lat},{lon})[{key}~"{regex}"];')
-    inner = "\n      ".join(parts)
-    ql = (
-        "[out:json][timeout:25];\n"
-        "(\n"
-        f"      {inner}\n"
-        ");\n"
-        "out center 200;"
-    )
-    return ql
-
-def _overpass_query_any(lat: float, lon: float, radius_km: float, filters: List[Tuple[str, str]]) -> List[Dict]:
-    """Try multiple mirrors; if all fail/empty, return []."""
-    radius_m = int(radius_km * 1000)
-    ql = _build_overpass_query(lat, lon, radius_m, filters)
-    for url in settings.overpass_endpoints:
-        try:
-            r = httpx.post(url, data={"data": ql}, timeout=HTTP_TIMEOUT)
-            r.raise_for_status()
-            data = r.json()
-            elements = data.get("elements", [])
-            if elements:
-                return elements
-        except Exception:
-            continue
-    return []
+        parts = [f'{kind}(around:{radius_m},{lat},{lon})[{key}~"{regex}"];' for kind in ("node", "way", "relation")]
+        stmts.append("(\n      " + "\n      ".join(parts) + "\n);\n" + f"out center {settings.overpass_max_elements};")
+    return "[out:json][timeout:25];\n" + "\n".join(stmts)
+
+_OVERPASS_CACHE = PersistentCache("overpass", settings.overpass_cache_ttl_s, settings.overpass_cache_stale_s)
+
+def _quantize(v: float) -> float:
+    q = settings.overpass_cache_quantum_deg
+    return round(round(v / q) * q, 6)
+
+def _overpass_request(lat: float, lon: float, radius_km: float, filters: List[Tuple[str, str]]) -> Tuple[str, str]:
+    """(cache key, QL) for a query centred on the quantized point, so the key fully describes the QL."""
+    lat, lon, radius_m = _quantize(lat), _quantize(lon), int(radius_km * 1000)
+    return (make_key(lat, lon, radius_m, filters, settings.overpass_max_elements),
+            _build_overpass_query(lat, lon, radius_m, filters))
+
+OVERPASS_MIRRORS = MirrorPool(
+    settings.overpass_endpoints,
+    hedge_delay_s=settings.overpass_hedge_delay_s,
+    timeout_s=HTTP_TIMEOUT,
+    fail_threshold=settings.overpass_breaker_failures,
+    cooldown_s=settings.overpass_breaker_cooldown_s,
+)
+
+PARSE_STATS = register_stats("overpass_parse", Counter(responses=0, elements=0, kept=0, cut_short=0, merged=0))
+
+# all an element keeps once parsed: what _matches and the place converters read
+_PLACE_TAGS = ("name", "addr:full", "addr:street", "tourism", "leisure", "amenity", "shop", "cuisine",
+               "wheelchair", "diet:vegan", "diet:vegetarian", "diet:gluten_free")
+
+def _coords(e: Dict):
+    return e.get("lat") or (e.get("center") or {}).get("lat"), e.get("lon") or (e.get("center") or {}).get("lon")
+
+def _compact(e: Dict) -> Dict | None:
+    """A named, located element reduced to coordinates and _PLACE_TAGS; None if it can't be a place."""
+    tags = e.get("tags") or {}
+    la, lo = _coords(e)
+    if not tags.get("name") or la is None or lo is None:
+        return None
+    return {"type": e.get("type"), "id": e.get("id"), "lat": la, "lon": lo,
+            "tags": {k: tags[k] for k in _PLACE_TAGS if k in tags}}
+
+async def _elements(r: httpx.Response) -> List[Dict]:
+    """Places from a streamed Overpass body, converted as they arrive.
+
+    Stops reading once every filter has overpass_places_per_filter distinct
+    names, or after overpass_max_elements elements per filter, so memory and
+    parse time stay bounded whatever the mirror sends. An element matching
+    several filters comes once per `out`; it is kept once.
+    """
+    cap = settings.overpass_places_per_filter
+    filters = [(match, set()) for match in _FILTER_MATCHES]
+    limit = settings.overpass_max_elements * len(filters)
+    out: List[Dict] = []
+    ids, seen = set(), 0
+    PARSE_STATS["responses"] += 1
+    async for e in jsonstream.aitems(r.aiter_text(), "elements"):
+        if seen >= limit or all(len(names) >= cap for _, names in filters):
+            PARSE_STATS["cut_short"] += 1
+            break
+        seen += 1
+        place = _compact(e) if isinstance(e, dict) else None
+        if place is not None and (place["type"], place["id"]) not in ids:
+            name, wanted = place["tags"]["name"], False
+            for match, names in filters:
+                if len(names) < cap and _matches(place, match):
+                    names.add(name)
+                    wanted = True
+            if wanted:
+                ids.add((place["type"], place["id"]))
+                out.append(place)
+    PARSE_STATS["elements"] += seen
+    PARSE_STATS["kept"] += len(out)
+    return out
+
+@timed("overpass")
+async def _aoverpass_fetch(ql: str) -> List[Dict]:
+    """Hedged across mirrors; [] if all fail/empty."""
+    return await OVERPASS_MIRRORS.post({"data": ql}, _elements)
+
+async def _aoverpass_query_any(lat: float, lon: float, radius_km: float, filters: List[Tuple[str, str]]) -> List[Dict]:
+    key, ql = _overpass_request(lat, lon, radius_km, filters)
+    out = await deadline.bounded(_OVERPASS_CACHE.aget_or_fetch(key, lambda: _aoverpass_fetch(ql)), HTTP_TIMEOUT, "places")
+    if out is None:  # out of time; the fetch carries on into the cache, meanwhile serve any older answer
+        hit = await asyncio.to_thread(_OVERPASS_CACHE.get, key)
+        return hit[0] if hit else []
+    if not out:  # every mirror failed, or nothing around: either way not a plan worth caching
+        deadline.fail("places")
+    return out
 
 # Broad but relevant categories
 POI_FILTERS = [
@@ -65,28 +210,107 @@ RESTO_FILTERS = [
     ("shop", "coffee|tea|confectionery"),
 ]
 
-def fetch_osm_pois(lat: float, lon: float, radius_km: float, max_radius_km: float) -> List[Dict]:
-    """Attractions/parks/museums etc. Widens radius up to max if empty."""
+PLACE_FILTERS = POI_FILTERS + RESTO_FILTERS
+
+def _compile(filters: List[Tuple[str, str]]):
+    # Overpass `key~"regex"` is an unanchored match, same as re.search
+    return [(key, re.compile(regex)) for key, regex in filters]
+
+_POI_MATCH = _compile(POI_FILTERS)
+_RESTO_MATCH = _compile(RESTO_FILTERS)
+_FILTER_MATCHES = [_compile([f]) for f in PLACE_FILTERS]  # one per `out` statement of the query
+
+def _matches(element: Dict, compiled) -> bool:
+    tags = element.get("tags") or {}
+    return any(rx.search(tags.get(key) or "") for key, rx in compiled)
+
+def _radii(radius_km: float, max_radius_km: float):
     cur = radius_km
-    while cur <= max_radius_km:
-        elements = _overpass_query_any(lat, lon, cur, POI_FILTERS)
-        pois = _elements_to_pois(elements)
-        if pois:
-            return _dedup_by_title(pois)[: settings.max_pois]
+    while cur < max_radius_km:
+        yield cur
         cur += max(1.5, cur * 0.5)  # widen progressively
-    return []
+    yield max_radius_km
 
-def fetch_osm_restaurants(lat: float, lon: float, radius_km: float, max_radius_km: float) -> List[Dict]:
-    """Restaurants & cafés; widens radius up to max if empty."""
-    cur = radius_km
-    while cur <= max_radius_km:
-        elements = _overpass_query_any(lat, lon, cur, RESTO_FILTERS)
-        restos = _elements_to_restos(elements)
-        if restos:
-            return _dedup_by_title(restos)[: settings.max_restaurants]
-        cur += max(1.5, cur * 0.5)
+def _nearest_ring(lat: float, lon: float, items: List[Dict], radius_km: float, max_radius_km: float, limit: int) -> List[Dict]:
+    """Smallest widening ring around (lat, lon) that contains anything, nearest first."""
+    ranked = sorted(((haversine_km(lat, lon, *it["geo"]), it) for it in items), key=lambda x: x[0])
+    for ring in _radii(radius_km, max_radius_km):
+        inside = [it for d, it in ranked if d <= ring]
+        if inside:
+            return _dedup_by_title(inside)[:limit]
     return []
 
+_WORD = re.compile(r"\w+")
+
+def _name_key(name: str) -> str:
+    """'The Blue  Door Café!' -> 'the blue door cafe'"""
+    folded = "".join(ch for ch in unicodedata.normalize("NFKD", name.casefold()) if not unicodedata.combining(ch))
+    return " ".join(_WORD.findall(folded))
+
+def _richer(a: Dict, b: Dict) -> Dict:
+    """The element with more tags, with tags only the other has filled in."""
+    ta, tb = a.get("tags") or {}, b.get("tags") or {}
+    base, other = (a, tb) if len(ta) >= len(tb) else (b, ta)
+    return {**base, "tags": {**other, **(base.get("tags") or {})}}
+
+def _merge_near_duplicates(elements: List[Dict]) -> List[Dict]:
+    """One element per venue: same normalized name within osm_dedup_radius_m, merged into the richest.
+
+    Elements are bucketed by (name, grid cell) with cells twice the radius
+    wide, so each is compared only with same-name elements in its own and the
+    8 neighbouring cells: linear in the number of elements. Order is kept.
+    """
+    radius_km = settings.osm_dedup_radius_m / 1000
+    out: List[Dict] = []
+    buckets: Dict[str, Dict[tuple, List[int]]] = {}  # name -> cell -> indexes into out
+    step = None
+    for e in elements:
+        name = (e.get("tags") or {}).get("name")
+        la, lo = _coords(e)
+        if radius_km <= 0 or not name or la is None or lo is None:
+            out.append(e)
+            continue
+        if step is None:  # one cell size per response: they span a city, where it barely changes
+            min_lat, max_lat, min_lon, max_lon = bbox(la, lo, radius_km)
+            step = (max_lat - min_lat, max_lon - min_lon)
+        key, cy, cx = _name_key(name), int(la // step[0]), int(lo // step[1])
+        cells = buckets.get(key)  # most names are unique: no neighbourhood to look at
+        twin = next((i for dy in (-1, 0, 1) for dx in (-1, 0, 1) for i in cells.get((cy + dy, cx + dx), ())
+                     if haversine_km(la, lo, *_coords(out[i])) <= radius_km), None) if cells else None
+        if twin is None:
+            buckets.setdefault(key, {}).setdefault((cy, cx), []).append(len(out))
+            out.append(e)
+        else:
+            out[twin] = _richer(out[twin], e)
+    PARSE_STATS["merged"] += len(elements) - len(out)
+    return out
+
+def _split_places(lat: float, lon: float, elements: List[Dict], radius_km: float, max_radius_km: float):
+    elements = _merge_near_duplicates(elements)
+    pois = _elements_to_pois([e for e in elements if _matches(e, _POI_MATCH)])
+    restos = _elements_to_restos([e for e in elements if _matches(e, _RESTO_MATCH)])
+    return (
+        _nearest_ring(lat, lon, pois, radius_km, max_radius_km, settings.max_pois),
+        _nearest_ring(lat, lon, restos, radius_km, max_radius_km, settings.max_restaurants),
+    )
+
+async def afetch_osm_places(lat: float, lon: float, radius_km: float, max_radius_km: float) -> Tuple[List[Dict], List[Dict]]:
+    """(pois, restaurants) from one union query at max_radius_km.
+
+    Widening happens locally: each list is cut to the smallest ring (starting
+    at radius_km) that has results, so a city costs at most one upstream call.
+    """
+    elements = await _aoverpass_query_any(lat, lon, max_radius_km, PLACE_FILTERS)
+    return _split_places(lat, lon, elements, radius_km, max_radius_km)
+
+async def afetch_osm_pois(lat: float, lon: float, radius_km: float, max_radius_km: float) -> List[Dict]:
+    """Attractions/parks/museums etc. within the smallest non-empty ring."""
+    return (await afetch_osm_places(lat, lon, radius_km, max_radius_km))[0]
+
+async def afetch_osm_restaurants(lat: float, lon: float, radius_km: float, max_radius_km: float) -> List[Dict]:
+    """Restaurants & cafés within the smallest non-empty ring."""
+    return (await afetch_osm_places(lat, lon, radius_km, max_radius_km))[1]
+
 def _elements_to_pois(elements: List[Dict]) -> List[Dict]:
     out = []
     for e in elements:
@@ -56,3 +56,12 @@ class AgentRequest(BaseModel):
 class AgentResponse(BaseModel):
     run_id: int
     output: PlanResponse
+
+class BatchItemResult(BaseModel):
+    index: int
+    run_id: Optional[int] = None
+    output: Optional[PlanResponse] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
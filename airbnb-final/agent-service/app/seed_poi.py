@@ -1,7 +1,8 @@
-from .db import engine, SessionLocal
-from .models import Base, POI, Restaurant
+from .db import SessionLocal, insert_ignore
+from .init_db import ensure_schema
+from .models import POI, Restaurant, with_geocell, index_poi_tags, touch_cells
 
-Base.metadata.create_all(bind=engine)
+ensure_schema()
 db = SessionLocal()
 city = "San Francisco, CA"
 
@@ -26,7 +27,10 @@ sample_rest = [
        tags="gluten-free", price_tier="$$", city=city),
 ]
 
-for p in sample_pois: db.add(POI(**p))
-for r in sample_rest: db.add(Restaurant(**r))
+# re-runnable: rows already present for (name, city) are skipped
+insert_ignore(db, POI.__table__, [with_geocell(p) for p in sample_pois])
+index_poi_tags(db, city, [p["name"] for p in sample_pois])
+insert_ignore(db, Restaurant.__table__, [with_geocell(r) for r in sample_rest])
+touch_cells(db, [p["geocell"] for p in sample_pois + sample_rest])
 db.commit(); db.close()
 print("Seeded sample POIs and Restaurants.")
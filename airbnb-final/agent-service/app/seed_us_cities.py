@@ -2,10 +2,12 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Dict
 
-from .db import engine, SessionLocal
-from .models import Base, POI, Restaurant
+from .db import SessionLocal, insert_ignore
+from .geocoder import build_from_pois
+from .init_db import ensure_schema
+from .models import POI, Restaurant, with_geocell, index_poi_tags, touch_cells
 
-Base.metadata.create_all(bind=engine)
+ensure_schema()
 
 @dataclass
 class Place:
@@ -149,28 +151,20 @@ CITY_DATA: Dict[str, Dict[str, List[Place]]] = {
 }
 
 def upsert_city(city: str, data: Dict[str, List[Place]], db):
-    # prevent duplicates by (name, city)
-    existing_pois = {(n, c) for n, c in db.query(POI.name, POI.city).all()}
-    existing_rest = {(n, c) for n, c in db.query(Restaurant.name, Restaurant.city).all()}
-
-    for p in data.get("pois", []):
-        key = (p.name, city)
-        if key in existing_pois:
-            continue
-        db.add(POI(
-            name=p.name, address=p.address, lat=p.lat, lon=p.lon,
-            tags=p.tags, price_tier=p.price, duration_minutes=p.duration,
-            wheelchair_friendly=p.wheelchair, child_friendly=p.child, city=city
-        ))
-
-    for r in data.get("restaurants", []):
-        key = (r.name, city)
-        if key in existing_rest:
-            continue
-        db.add(Restaurant(
-            name=r.name, address=r.address, lat=r.lat, lon=r.lon,
-            tags=r.tags, price_tier=r.price, city=city
-        ))
+    # duplicates by (name, city) are skipped by the unique index
+    pois = [with_geocell(dict(
+        name=p.name, address=p.address, lat=p.lat, lon=p.lon,
+        tags=p.tags, price_tier=p.price, duration_minutes=p.duration,
+        wheelchair_friendly=p.wheelchair, child_friendly=p.child, city=city
+    )) for p in data.get("pois", [])]
+    restaurants = [with_geocell(dict(
+        name=r.name, address=r.address, lat=r.lat, lon=r.lon,
+        tags=r.tags, price_tier=r.price, city=city
+    )) for r in data.get("restaurants", [])]
+    insert_ignore(db, POI.__table__, pois)
+    index_poi_tags(db, city, [p["name"] for p in pois])
+    insert_ignore(db, Restaurant.__table__, restaurants)
+    touch_cells(db, [r["geocell"] for r in pois + restaurants])
 
 def main():
     db = SessionLocal()
@@ -179,6 +173,8 @@ def main():
             upsert_city(city, data, db)
         db.commit()
         print(f"✅ Seeded {len(CITY_DATA)} cities (POIs + Restaurants).")
+        # seeded cities geocode offline from here on
+        print(f"✅ Gazetteer: {build_from_pois()} city centroids.")
     finally:
         db.close()
 
@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 from typing import Iterable
+import re
 
 def daterange(d1: date, d2: date):
     cur = d1
@@ -7,9 +8,17 @@ def daterange(d1: date, d2: date):
         yield cur
         cur += timedelta(days=1)
 
+def normalize(text: str) -> str:
+    """Case/whitespace-insensitive form of free text (place names, asks)."""
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
 def to_price_tier(budget: str) -> str:
     return budget if budget in {"$", "$$", "$$$"} else "$$"
 
+def split_tags(tags: str) -> list[str]:
+    """'Museum, art,,museum' -> ['museum', 'art'] (normalized, order kept)."""
+    return list(dict.fromkeys(t.strip().lower() for t in (tags or "").split(",") if t.strip()))
+
 def interest_match(tags: str, interests: Iterable[str]) -> bool:
     tagset = {t.strip().lower() for t in (tags or "").split(",")}
     wants = {i.strip().lower() for i in interests or []}
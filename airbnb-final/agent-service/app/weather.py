@@ -1,42 +1,88 @@
 from datetime import date
+import asyncio
+import logging
 import httpx
 
+from . import deadline, geocoder, weather_store
+from .config import settings
+from .metrics import timed
+
+logger = logging.getLogger("uvicorn.error")
+
 HTTP_TIMEOUT = 8.0
 
-def geocode_city(city: str) -> tuple[float, float]:
-    try:
-        r = httpx.get(
-            "https://geocoding-api.open-meteo.com/v1/search",
-            params={"name": city, "count": 1},
-            timeout=HTTP_TIMEOUT,
-        )
+GEOCODE_URL = settings.geocode_url
+FORECAST_URL = settings.forecast_url
+
+def _forecast_params(lat: float, lon: float, start: date, end: date) -> dict:
+    return {
+        "latitude": lat, "longitude": lon,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "daily": "temperature_2m_max,temperature_2m_min,precipitation_probability_mean",
+        "timezone": "auto",
+    }
+
+def _first_result(data: dict) -> tuple[float, float]:
+    if data.get("results"):
+        it = data["results"][0]
+        return float(it["latitude"]), float(it["longitude"])
+    return (0.0, 0.0)
+
+@timed("geocode")
+async def ageocode_city(city: str) -> tuple[float, float]:
+    """LRU -> geocodes table -> gazetteer -> Open-Meteo; (0.0, 0.0) if all miss."""
+    latlon = await geocoder.alookup(city, _aremote_geocode)
+    if latlon == geocoder.MISS:
+        deadline.fail("geocode")
+    return latlon
+
+async def _aremote_geocode(city: str) -> tuple[float, float]:
+    async def call():
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            r = await client.get(GEOCODE_URL, params={"name": city, "count": 1})
         r.raise_for_status()
-        data = r.json()
-        if data.get("results"):
-            it = data["results"][0]
-            return float(it["latitude"]), float(it["longitude"])
+        return _first_result(r.json())
+    try:
+        return await deadline.bounded(call(), HTTP_TIMEOUT, "geocode", (0.0, 0.0))
     except Exception:
-        pass
-    return (0.0, 0.0)
+        return (0.0, 0.0)
 
-def daily_weather(lat: float, lon: float, start: date, end: date):
+async def _afetch_daily(lat: float, lon: float, start: date, end: date):
     try:
-        r = httpx.get(
-            "https://api.open-meteo.com/v1/forecast",
-            params={
-                "latitude": lat, "longitude": lon,
-                "start_date": start.isoformat(),
-                "end_date": end.isoformat(),
-                "daily": "temperature_2m_max,temperature_2m_min,precipitation_probability_mean",
-                "timezone": "auto",
-            },
-            timeout=HTTP_TIMEOUT,
-        )
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            r = await client.get(FORECAST_URL, params=_forecast_params(lat, lon, start, end))
         r.raise_for_status()
         return r.json().get("daily", {})
     except Exception:
         return {}
 
+def _merge(have: dict, c, daily: dict) -> dict:
+    """`have` plus the fetched days, which are stored on the way (a failed store only costs the next request)."""
+    fetched = weather_store.parse(daily)
+    try:
+        weather_store.save(c, fetched)
+    except Exception as e:
+        logger.warning("weather store: save failed for cell %s: %s", c, e)
+    return {**have, **fetched}
+
+@timed("weather")
+async def adaily_weather(lat: float, lon: float, start: date, end: date):
+    """Forecast for [start, end], fetching only days the per-day store lacks."""
+    c = weather_store.cell(lat, lon)
+    have = await asyncio.to_thread(weather_store.load, c, start, end)
+    span = weather_store.missing_span(have, start, end)
+    if span:
+        weather_store.STATS["fetches"] += 1
+        daily = await deadline.bounded(_afetch_daily(*weather_store.cell_center(c), *span), HTTP_TIMEOUT, "weather")
+        if daily is None:  # out of time: older forecasts for the days we lack, if the store has them
+            have = {**await asyncio.to_thread(weather_store.load, c, start, end, False), **have}
+        elif not daily:
+            deadline.fail("weather")
+        else:
+            have = await asyncio.to_thread(_merge, have, c, daily)
+    return weather_store.assemble(have, start, end)
+
 def summarize_weather(daily) -> str:
     if not daily:
         return "Weather data unavailable."
@@ -0,0 +1,87 @@
+"""Per-day forecast store shared by every trip to the same area.
+
+Days are keyed by a coarse (lat, lon) grid cell and the calendar date, and
+stay fresh for WEATHER_TTL_S (roughly how often the forecast models update).
+A request only goes upstream for the span of days that are missing or stale,
+and only for days inside the provider's forecast horizon.
+"""
+from __future__ import annotations
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select
+
+from .cache import register_stats
+from .config import settings
+from .db import engine, upsert
+from .models import WeatherDay
+from .utils import daterange
+
+STATS = register_stats("weather", Counter(day_hits=0, day_misses=0, fetches=0))
+_TABLE = WeatherDay.__table__
+
+DAILY_KEYS = ("temperature_2m_max", "temperature_2m_min", "precipitation_probability_mean")
+
+def cell(lat: float, lon: float) -> Tuple[int, int]:
+    q = settings.weather_grid_deg
+    return round(lat / q), round(lon / q)
+
+def cell_center(c: Tuple[int, int]) -> Tuple[float, float]:
+    q = settings.weather_grid_deg
+    return round(c[0] * q, 4), round(c[1] * q, 4)
+
+def load(c: Tuple[int, int], start: date, end: date, fresh_only: bool = True) -> Dict[date, tuple]:
+    """Cached days in [start, end] -> (tmax, tmin, precip); any age with fresh_only=False."""
+    cutoff = time.time() - settings.weather_ttl_s if fresh_only else 0
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(_TABLE.c.day, _TABLE.c.tmax, _TABLE.c.tmin, _TABLE.c.precip).where(
+                _TABLE.c.cell_lat == c[0], _TABLE.c.cell_lon == c[1],
+                _TABLE.c.day.between(start, end), _TABLE.c.fetched_at >= cutoff,
+            )
+        ).all()
+    return {r.day: (r.tmax, r.tmin, r.precip) for r in rows}
+
+def missing_span(have: Dict[date, tuple], start: date, end: date) -> Tuple[date, date] | None:
+    """Smallest fetchable [first, last] covering the missing days, clipped to the forecast horizon."""
+    horizon = date.today() + timedelta(days=settings.weather_horizon_days - 1)
+    missing = [d for d in daterange(start, min(end, horizon)) if d not in have]
+    STATS["day_hits"] += len(have)
+    STATS["day_misses"] += len(missing)
+    if not missing:
+        return None
+    return missing[0], missing[-1]
+
+def parse(daily: dict) -> Dict[date, tuple]:
+    """Open-Meteo `daily` dict -> {day: (tmax, tmin, precip)}."""
+    days = [date.fromisoformat(t) for t in daily.get("time") or []]
+    cols = [daily.get(k) or [None] * len(days) for k in DAILY_KEYS]
+    return {d: tuple(col[i] for col in cols) for i, d in enumerate(days)}
+
+def save(c: Tuple[int, int], fetched: Dict[date, tuple]) -> None:
+    """Upsert fetched days; requests filling the same cell at once just overwrite each other."""
+    now = time.time()
+    with engine.begin() as conn:
+        upsert(conn, _TABLE, [
+            {"cell_lat": c[0], "cell_lon": c[1], "day": d, "tmax": v[0], "tmin": v[1], "precip": v[2], "fetched_at": now}
+            for d, v in fetched.items()
+        ])
+
+def assemble(days: Dict[date, tuple], start: date, end: date) -> dict:
+    """Open-Meteo-shaped `daily` dict for the days we have, in date order."""
+    have = [d for d in daterange(start, end) if d in days]
+    if not have:
+        return {}
+    out: Dict[str, List] = {"time": [d.isoformat() for d in have]}
+    for i, k in enumerate(DAILY_KEYS):
+        out[k] = [days[d][i] for d in have]
+    return out
+
+def subrange(daily: dict, start: date, end: date) -> dict:
+    """The [start, end] days of an assembled `daily` dict (one fetch serving several trips)."""
+    keep = [i for i, t in enumerate(daily.get("time") or []) if start <= date.fromisoformat(t) <= end]
+    if not keep:
+        return {}
+    return {k: [v[i] for i in keep] for k, v in daily.items()}
@@ -0,0 +1,80 @@
+"""Cache-fill cost vs. table size: bulk INSERT-ignore vs. the old load-all-keys + ORM path.
+
+    python -m benchmarks.bench_cache_fill [--sizes 1000 10000 100000] [--batch 40]
+
+Runs against a throwaway SQLite file unless DATABASE_URL is set.
+"""
+from __future__ import annotations
+import argparse
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from app.agent import _store_osm                  # noqa: E402
+from app.db import SessionLocal, insert_ignore    # noqa: E402
+from app.init_db import ensure_schema             # noqa: E402
+from app.models import POI, Restaurant, with_geocell  # noqa: E402
+
+def _place(i: int, kind: str) -> dict:
+    return {"title": f"{kind} {i}", "address": "", "geo": (40.0 + (i % 1000) / 1e4, -74.0 + (i // 1000) / 1e4),
+            "tags": ["park"] if kind == "poi" else ["cafe"], "price_tier": "$$"}
+
+def _legacy_fill(city, pois, restaurants, db):
+    existing_pois = {(p.name, p.city) for p in db.query(POI.name, POI.city).all()}
+    for p in pois:
+        if (p["title"], city) not in existing_pois:
+            db.add(POI(name=p["title"], address="", lat=p["geo"][0], lon=p["geo"][1],
+                       tags=",".join(p["tags"]), price_tier="$$", city=city))
+    existing_rest = {(r.name, r.city) for r in db.query(Restaurant.name, Restaurant.city).all()}
+    for r in restaurants:
+        if (r["title"], city) not in existing_rest:
+            db.add(Restaurant(name=r["title"], address="", lat=r["geo"][0], lon=r["geo"][1],
+                              tags=",".join(r["tags"]), price_tier="$$", city=city))
+    db.commit()
+
+def _grow(db, model, kind: str, upto: int, have: int) -> None:
+    for start in range(have, upto, 10_000):
+        rows = []
+        for i in range(start, min(upto, start + 10_000)):
+            p = _place(i, kind)
+            rows.append(with_geocell({"name": p["title"], "address": "", "lat": p["geo"][0], "lon": p["geo"][1],
+                                      "tags": ",".join(p["tags"]), "price_tier": "$$", "city": f"filler {i // 50}"}))
+        insert_ignore(db, model.__table__, rows)
+    db.commit()
+
+def _time(fn, db, batch: int, round_: int, repeats: int) -> float:
+    best = float("inf")
+    for rep in range(repeats):
+        city = f"bench {round_}-{rep}-{fn.__name__}"
+        pois = [_place(i, "poi") for i in range(batch)]
+        restos = [_place(i, "resto") for i in range(batch)]
+        t0 = time.perf_counter()
+        fn(city, pois, restos, db)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--batch", type=int, default=40)
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    ensure_schema()
+    db = SessionLocal()
+    have = 0
+    print(f"{'rows/table':>12} {'bulk ms':>10} {'legacy ms':>10}")
+    for n, size in enumerate(sorted(args.sizes)):
+        _grow(db, POI, "poi", size, have)
+        _grow(db, Restaurant, "resto", size, have)
+        have = size
+        bulk = _time(_store_osm, db, args.batch, n, args.repeats)
+        legacy = _time(_legacy_fill, db, args.batch, n, args.repeats)
+        print(f"{size:>12,} {bulk:>10.2f} {legacy:>10.2f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
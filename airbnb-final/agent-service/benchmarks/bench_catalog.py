@@ -0,0 +1,78 @@
+"""Cached-place lookups: in-memory catalog vs. the per-request SQL path.
+
+    python -m benchmarks.bench_catalog [--sizes 1000 10000 100000] [--lookups 200]
+
+Each lookup is what one plan does: nearby POIs filtered by interests and
+mobility, plus nearby restaurants, both turned into cards. The SQL path
+grows linearly with the table, so ``--lookups`` is the count at 1,000 POIs
+and shrinks in proportion for bigger tables (never below 5); timings are
+per lookup either way. Runs against a throwaway SQLite file unless
+DATABASE_URL is set.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from app import agent                             # noqa: E402
+from app.catalog import CATALOG                   # noqa: E402
+from app.config import settings                   # noqa: E402
+from app.db import AsyncSessionLocal, async_engine  # noqa: E402
+from app.init_db import ensure_schema             # noqa: E402
+
+LAT, LON = 40.73, -73.99
+TAGS = ["museum", "park", "art", "gallery", "theatre", "garden", "viewpoint", "music", "playground", "zoo"]
+
+async def _grow(db, upto: int, have: int, rng: random.Random) -> None:
+    for start in range(have, upto, 5_000):
+        n = min(5_000, upto - start)
+        pt = lambda: (LAT + rng.gauss(0, 0.08), LON + rng.gauss(0, 0.1))
+        pois = [{"title": f"poi {start + i}", "geo": pt(), "tags": rng.sample(TAGS, rng.randint(1, 3)),
+                 "price_tier": rng.choice(["$", "$$", "$$$"]), "duration_minutes": rng.choice([60, 90, 180]),
+                 "wheelchair_friendly": rng.random() < 0.4} for i in range(n)]
+        rests = [{"title": f"rest {start + i}", "geo": pt(), "tags": ["cafe"], "price_tier": "$$"} for i in range(n // 2)]
+        await agent._acache_osm_into_db("bench", pois, rests, db)
+
+async def _lookups(db, n: int, rng: random.Random) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        lat, lon = LAT + rng.gauss(0, 0.03), LON + rng.gauss(0, 0.03)
+        await agent._aload_pois("bench", rng.sample(TAGS, 2), rng.choice([None, "wheelchair"]), "$$", db, lat, lon)
+        await agent._aload_restaurants("bench", "$$", db, lat, lon)
+    return (time.perf_counter() - t0) / n
+
+async def _run(args) -> None:
+    print(f"{'pois':>9} {'sql ms':>8} {'catalog ms':>11} {'refresh ms':>11}")
+    have = 0
+    async with AsyncSessionLocal() as db:
+        for size in args.sizes:
+            settings.in_memory_catalog = False          # grow without per-batch refreshes
+            await _grow(db, size, have, random.Random(size))
+            have = max(have, size)
+            n = max(5, args.lookups * 1_000 // size)
+            sql = await _lookups(db, n, random.Random(0))
+            t0 = time.perf_counter()
+            CATALOG.refresh()
+            refresh = time.perf_counter() - t0
+            settings.in_memory_catalog = True
+            mem = await _lookups(db, n, random.Random(0))
+            print(f"{size:>9,} {sql * 1000:>8.2f} {mem * 1000:>11.2f} {refresh * 1000:>11.1f}")
+    await async_engine.dispose()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--lookups", type=int, default=200)
+    args = ap.parse_args()
+
+    ensure_schema()
+    asyncio.run(_run(args))
+
+if __name__ == "__main__":
+    main()
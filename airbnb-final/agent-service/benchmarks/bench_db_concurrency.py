@@ -0,0 +1,123 @@
+"""Concurrent request throughput: sync sessions on a threadpool vs. AsyncSession on the event loop.
+
+    python -m benchmarks.bench_db_concurrency [--requests 400] [--concurrency 10 50 200] [--io-ms 50] [--read-only]
+
+Each simulated request does what /agent/plan does against the database:
+one radius lookup, a wait standing in for the upstream calls, then the
+Booking/Preference/PlanRun insert. The sync side runs on a 40-worker pool,
+the size of Starlette's default threadpool that sync endpoints occupy.
+Runs against a throwaway SQLite file (WAL, synchronous=NORMAL, so commit
+fsyncs don't swamp the comparison) unless DATABASE_URL is set; point it at
+MySQL/Postgres to measure the production drivers.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+THROWAWAY = "DATABASE_URL" not in os.environ
+if THROWAWAY:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from sqlalchemy import event                                                     # noqa: E402
+from app.db import AsyncSessionLocal, SessionLocal, async_engine, engine, insert_ignore  # noqa: E402
+from app.init_db import ensure_schema                                            # noqa: E402
+from app.models import POI, Booking, PlanRun, Preference, with_geocell           # noqa: E402
+
+LAT, LON = 40.73, -73.99
+RADIUS_KM = 2
+THREADPOOL = 40
+
+if THROWAWAY:
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _fast_sqlite(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA busy_timeout=30000")
+        cur.close()
+
+def _seed(n: int) -> None:
+    rows = [with_geocell({"name": f"bench poi {i}", "address": "", "lat": LAT + (i % 100) / 1e3,
+                          "lon": LON + (i // 100) / 1e3, "tags": "park", "price_tier": "$$", "city": "bench"})
+            for i in range(n)]
+    with SessionLocal() as db:
+        insert_ignore(db, POI.__table__, rows)
+        db.commit()
+
+def _run_rows(n_pois: int):
+    booking = Booking(start_date=date(2026, 1, 1), end_date=date(2026, 1, 3), location="bench", party_type="solo")
+    pref = Preference(budget_tier="$$", interests="park")
+    return booking, pref, lambda: PlanRun(booking_id=booking.id, preference_id=pref.id,
+                                          result_json={"pois": n_pois})
+
+def _sync_request(io_s: float, write: bool) -> None:
+    with SessionLocal() as db:
+        pois = POI.near(db, LAT, LON, RADIUS_KM, limit=50)
+        time.sleep(io_s)
+        if not write:
+            return
+        booking, pref, run = _run_rows(len(pois))
+        db.add_all([booking, pref]); db.flush()
+        db.add(run()); db.commit()
+
+async def _async_request(io_s: float, write: bool) -> None:
+    async with AsyncSessionLocal() as db:
+        pois = await POI.anear(db, LAT, LON, RADIUS_KM, limit=50)
+        await db.commit()
+        await asyncio.sleep(io_s)
+        if not write:
+            return
+        booking, pref, run = _run_rows(len(pois))
+        db.add_all([booking, pref]); await db.flush()
+        db.add(run()); await db.commit()
+
+def _bench_sync(n: int, concurrency: int, io_s: float, write: bool) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concurrency, THREADPOOL)) as pool:
+        list(pool.map(lambda _: _sync_request(io_s, write), range(n)))
+    return n / (time.perf_counter() - t0)
+
+async def _bench_async(n: int, concurrency: int, io_s: float, write: bool) -> float:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            await _async_request(io_s, write)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    return n / (time.perf_counter() - t0)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    ap.add_argument("--io-ms", type=float, default=50.0)
+    ap.add_argument("--pois", type=int, default=1_000)
+    ap.add_argument("--read-only", action="store_true", help="skip the PlanRun insert")
+    args = ap.parse_args()
+
+    ensure_schema()
+    _seed(args.pois)
+    io_s = args.io_ms / 1000
+
+    async def run_async(c):
+        try:
+            return await _bench_async(args.requests, c, io_s, not args.read_only)
+        finally:
+            await async_engine.dispose()
+
+    print(f"{'concurrency':>12} {'sync req/s':>11} {'async req/s':>12}")
+    for c in args.concurrency:
+        sync_rps = _bench_sync(args.requests, c, io_s, not args.read_only)
+        async_rps = asyncio.run(run_async(c))
+        print(f"{c:>12} {sync_rps:>11.1f} {async_rps:>12.1f}")
+
+if __name__ == "__main__":
+    main()
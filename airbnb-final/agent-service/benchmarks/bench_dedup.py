@@ -0,0 +1,67 @@
+"""Near-duplicate merging of OSM elements vs. element count.
+
+    python -m benchmarks.bench_dedup [--elements 1000 10000 50000] [--twins 0.3]
+
+Synthetic city: named nodes scattered over ~20 km, a ``--twins`` share of
+them mapped a second time as a way a few metres off with the name in
+another case/punctuation/accents and more tags (the node + building case).
+Names repeat across the city, so same-name venues far apart must stay
+separate. The run starts by checking a known pair merges: "Blue Door Café"
+and "blue door cafe" 14 m apart.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from app.retrieval import _merge_near_duplicates   # noqa: E402
+
+def _twin_name(name: str) -> str:
+    return name.replace("é", "e").upper() + "!"
+
+def _check_accents():
+    # 1.26e-4 degrees of latitude is ~14 m
+    pair = [{"type": "node", "id": 1, "lat": 40.7, "lon": -74.0, "tags": {"name": "Blue Door Café", "amenity": "cafe"}},
+            {"type": "way", "id": 2, "center": {"lat": 40.7 + 1.26e-4, "lon": -74.0},
+             "tags": {"name": "blue door cafe", "amenity": "cafe", "cuisine": "coffee"}}]
+    merged = _merge_near_duplicates(pair)
+    assert len(merged) == 1 and merged[0]["tags"]["cuisine"] == "coffee", merged
+
+def _elements(n: int, twins: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    names = [f"Venue {i}" + (" Café" if i % 2 else "") for i in range(max(1, n // 10))]
+    out = []
+    while len(out) < n:
+        name, lat, lon = rng.choice(names), 40.65 + rng.random() * 0.2, -74.05 + rng.random() * 0.25
+        out.append({"type": "node", "id": len(out), "lat": lat, "lon": lon, "tags": {"name": name, "amenity": "cafe"}})
+        if rng.random() < twins:
+            out.append({"type": "way", "id": len(out), "center": {"lat": lat + rng.uniform(-2e-4, 2e-4),
+                                                                  "lon": lon + rng.uniform(-2e-4, 2e-4)},
+                        "tags": {"name": _twin_name(name), "amenity": "cafe", "cuisine": "coffee", "wheelchair": "yes"}})
+    return out[:n]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--elements", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    ap.add_argument("--twins", type=float, default=0.3)
+    ap.add_argument("--repeats", type=int, default=3)
+    args = ap.parse_args()
+
+    _check_accents()
+    print(f"{'elements':>9} {'kept':>7} {'merged':>7} {'best ms':>8} {'us/elem':>8}")
+    for n in args.elements:
+        elements = _elements(n, args.twins)
+        best, kept = float("inf"), 0
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            kept = len(_merge_near_duplicates(elements))
+            best = min(best, time.perf_counter() - t0)
+        print(f"{n:>9,} {kept:>7,} {n - kept:>7,} {best * 1000:>8.1f} {best / n * 1e6:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Itinerary engine cost vs. pool size, with the mean per-day spread it produces.
+
+    python -m benchmarks.bench_itinerary [--sizes 60 1000 5000 10000] [--days 3 7 14]
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.itinerary import haversine_matrix, plan_days
+
+def _pool(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    lat = 40.73 + rng.normal(0, 0.05, n)
+    lon = -73.99 + rng.normal(0, 0.06, n)
+    return [{"title": f"place {i}", "geo": (float(a), float(b))} for i, (a, b) in enumerate(zip(lat, lon))]
+
+def _spread_km(days) -> float:
+    """Mean over days of the widest pair of stops."""
+    widths = []
+    for d in filter(None, days):
+        pts = np.array([it["geo"] for it in d])
+        widths.append(haversine_matrix(pts, pts).max())
+    return float(np.mean(widths)) if widths else 0.0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[60, 1_000, 5_000, 10_000])
+    ap.add_argument("--days", type=int, nargs="+", default=[3, 7, 14])
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'pool':>8} {'days':>5} {'best ms':>9} {'spread km':>10}")
+    for size in args.sizes:
+        pool = _pool(size)
+        for n_days in args.days:
+            best = float("inf")
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                days = plan_days(pool, n_days, 3, (40.73, -73.99), random.Random("bench"))
+                best = min(best, time.perf_counter() - t0)
+            print(f"{size:>8,} {n_days:>5} {best * 1000:>9.2f} {_spread_km(days):>10.2f}")
+
+if __name__ == "__main__":
+    main()
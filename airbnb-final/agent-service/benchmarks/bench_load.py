@@ -0,0 +1,173 @@
+"""Offline load test of POST /agent/plan against stub upstreams.
+
+    python -m benchmarks.bench_load [--requests 200] [--concurrency 1 10 50] [--cities 20]
+                                    [--latency overpass=900 ...] [--errors overpass=0.1 ...] [--json]
+
+Starts benchmarks.stubs and the service (uvicorn, throwaway SQLite DB) as
+subprocesses, with every upstream URL pointed at the stubs. Each
+concurrency level gets a fresh service and DB, so levels start equally
+cold; within a level, requests cycle through ``--cities`` locations and a
+few asks (rule-parsed and LLM-parsed), so later requests hit the caches
+the way repeat traffic does. Reports throughput and p50/p95/p99 of the
+client-observed latency and of each Server-Timing stage.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.stubs import UPSTREAMS, env_for, parse_pairs
+
+ROOT = Path(__file__).resolve().parents[1]
+CITIES = ["Austin, TX", "Boston, MA", "Chicago, IL", "Denver, CO", "Los Angeles, CA", "Miami, FL", "New York, NY",
+          "Phoenix, AZ", "San Francisco, CA", "Seattle, WA", "Portland, OR", "Nashville, TN", "New Orleans, LA",
+          "San Diego, CA", "Atlanta, GA", "Philadelphia, PA"]
+ASKS = [None, "vegan food, wheelchair accessible", "cheap eats and parks",
+        "something romantic with live music and good wine"]  # the last one needs the LLM
+INTERESTS = [["museum", "park"], ["park"], ["art", "music"]]
+PERCENTILES = (50, 95, 99)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout_s: float = 30) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{url} exited with {proc.returncode}")
+        try:
+            httpx.get(url, timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise SystemExit(f"{url} not ready after {timeout_s}s")
+
+@contextmanager
+def _serve(args: List[str], ready_url: str, env: Dict[str, str]):
+    proc = subprocess.Popen([sys.executable, *args], cwd=ROOT, env={**os.environ, **env})
+    try:
+        _wait_ready(ready_url, proc)
+        yield proc
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def _body(i: int, cities: int) -> dict:
+    start = date.today() + timedelta(days=3 + i % 4)
+    return {
+        "booking": {"start_date": start.isoformat(), "end_date": (start + timedelta(days=2 + i % 3)).isoformat(),
+                    "location": CITIES[i % cities] if i % cities < len(CITIES) else f"Benchville {i % cities}, TX",
+                    "party_type": "couple"},
+        "preferences": {"interests": INTERESTS[i % len(INTERESTS)], "budget_tier": "$$"},
+        "ask": ASKS[i % len(ASKS)],
+    }
+
+def _server_timing(header: str) -> Dict[str, float]:
+    """'db;dur=10.2, total;dur=14.2' -> {"db": 10.2, "total": 14.2} (ms)."""
+    out = {}
+    for part in filter(None, (p.strip() for p in header.split(","))):
+        name, _, params = part.partition(";")
+        for p in params.split(";"):
+            if p.startswith("dur="):
+                out[name] = float(p[4:])
+    return out
+
+def _pct(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+async def _drive(base_url: str, n: int, concurrency: int, cities: int) -> Dict:
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    failures: Dict[str, int] = {}
+
+    async def one(client: httpx.AsyncClient, i: int):
+        async with gate:
+            t0 = time.perf_counter()
+            try:
+                r = await client.post("/agent/plan", json=_body(i, cities))
+            except httpx.HTTPError as e:
+                failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+                return
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if r.status_code != 200:
+                failures[str(r.status_code)] = failures.get(str(r.status_code), 0) + 1
+                return
+            for stage, ms in _server_timing(r.headers.get("server-timing", "")).items():
+                stages.setdefault(stage, []).append(ms)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(n)))
+        wall = time.perf_counter() - t0
+    summary = lambda xs: {"n": len(xs), **{f"p{p}": round(_pct(xs, p), 1) for p in PERCENTILES}}
+    return {
+        "concurrency": concurrency,
+        "requests": n,
+        "ok": n - sum(failures.values()),
+        "failures": failures,
+        "rps": round(n / wall, 1),
+        "latency_ms": summary(latencies) if latencies else {},
+        "stages_ms": {s: summary(xs) for s, xs in sorted(stages.items())},
+    }
+
+def _print(run: Dict) -> None:
+    print(f"\nconcurrency {run['concurrency']}: {run['rps']} req/s, {run['ok']}/{run['requests']} ok"
+          + (f", failures {run['failures']}" if run["failures"] else ""))
+    print(f"  {'stage':<10} {'n':>5} " + " ".join(f"{'p%d ms' % p:>9}" for p in PERCENTILES))
+    for name, s in [("client", run["latency_ms"]), *run["stages_ms"].items()]:
+        if s:
+            print(f"  {name:<10} {s['n']:>5} " + " ".join(f"{s['p%d' % p]:>9.1f}" for p in PERCENTILES))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--cities", type=int, default=20, help="distinct locations (beyond the fixtures: synthetic)")
+    ap.add_argument("--latency", nargs="*", metavar="UPSTREAM=MS", help=f"median ms per upstream ({', '.join(UPSTREAMS)})")
+    ap.add_argument("--errors", nargs="*", metavar="UPSTREAM=RATE", help="failure probability per upstream")
+    ap.add_argument("--elements", type=int, default=0, help="Overpass elements per response (default: fixture size)")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+    parse_pairs(args.latency), parse_pairs(args.errors)  # fail fast on typos
+
+    stub_port = _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stub_args = ["-m", "benchmarks.stubs", "--port", str(stub_port), "--elements", str(args.elements)]
+    stub_args += ["--latency", *args.latency] if args.latency else []
+    stub_args += ["--errors", *args.errors] if args.errors else []
+    runs = []
+    with _serve(stub_args, f"{stub_url}/stats", {}):
+        for c in args.concurrency:
+            port = _free_port()
+            env = {**env_for(stub_url), "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/load.db"}
+            app_args = ["-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+            with _serve(app_args, f"http://127.0.0.1:{port}/health", env):
+                runs.append(asyncio.run(_drive(f"http://127.0.0.1:{port}", args.requests, c, args.cities)))
+            if not args.json:
+                _print(runs[-1])
+        upstream = httpx.get(f"{stub_url}/stats").json()
+    if args.json:
+        print(json.dumps({"runs": runs, "upstream": upstream}))
+    else:
+        print("\nupstream calls:", ", ".join(f"{k} {v['requests']} ({v['errors']} failed)" for k, v in upstream.items()))
+
+if __name__ == "__main__":
+    main()
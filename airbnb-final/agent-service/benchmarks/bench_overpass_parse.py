@@ -0,0 +1,83 @@
+"""Overpass response handling: whole-body json + convert vs. the streamed, capped parse.
+
+    python -m benchmarks.bench_overpass_parse [--elements 1000 10000 100000] [--chunk 16384]
+
+Bodies are the stub fixture's elements repeated (names made distinct, about
+a third unnamed like real OSM data), served to the parser in ``--chunk``
+byte pieces from memory. OVERPASS_MAX_ELEMENTS is lifted to the body size
+here, so only OVERPASS_PLACES_PER_FILTER stops the streamed parse. Peak is
+tracemalloc's peak of Python allocations, body bytes excluded.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from app import retrieval                 # noqa: E402
+from app.config import settings           # noqa: E402
+
+FIXTURE = Path(__file__).parent / "fixtures" / "overpass.json"
+
+def _body(n: int) -> bytes:
+    doc = json.loads(FIXTURE.read_text())
+    base = doc["elements"]
+    elements = []
+    for i in range(n):
+        e = dict(base[i % len(base)], id=i)
+        tags = dict(e.get("tags") or {})
+        if i % 3 == 0:
+            tags.pop("name", None)
+        elif "name" in tags:
+            tags["name"] = f"{tags['name']} #{i}"
+        elements.append({**e, "tags": tags})
+    return json.dumps({**doc, "elements": elements}, indent=1).encode()
+
+def _convert(elements):
+    return (retrieval._elements_to_pois([e for e in elements if retrieval._matches(e, retrieval._POI_MATCH)]),
+            retrieval._elements_to_restos([e for e in elements if retrieval._matches(e, retrieval._RESTO_MATCH)]))
+
+def _whole(body: bytes, chunk: int):
+    return _convert(json.loads(body).get("elements", []))
+
+def _streamed(body: bytes, chunk: int):
+    async def pieces():
+        for i in range(0, len(body), chunk):
+            yield body[i:i + chunk]
+    return _convert(asyncio.run(retrieval._elements(httpx.Response(200, content=pieces()))))
+
+def _measure(fn, body: bytes, chunk: int):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    pois, restos = fn(body, chunk)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2**20, len(pois) + len(restos)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--elements", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--chunk", type=int, default=16_384)
+    args = ap.parse_args()
+
+    print(f"places per filter cap: {settings.overpass_places_per_filter}")
+    print(f"{'elements':>9} {'MB':>6} {'':>9} {'ms':>8} {'peak MB':>8} {'places':>7}")
+    for n in args.elements:
+        body = _body(n)
+        settings.overpass_max_elements = n
+        for label, fn in (("whole", _whole), ("streamed", _streamed)):
+            ms, peak, places = _measure(fn, body, args.chunk)
+            print(f"{n:>9,} {len(body) / 2**20:>6.1f} {label:>9} {ms:>8.1f} {peak:>8.2f} {places:>7}")
+
+if __name__ == "__main__":
+    main()
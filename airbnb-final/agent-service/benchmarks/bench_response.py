@@ -0,0 +1,88 @@
+"""Cost of turning a built plan into the stored blob and the HTTP body, before and after the single-render path.
+
+    python -m benchmarks.bench_response [--days 3 7 30] [--repeats 200]
+
+"before" is what POST /agent/plan did per response: validate the plan
+dict, model_dump it for the PlanRun blob and hash its sorted JSON, then let
+FastAPI validate and serialize the AgentResponse again. "after" validates
+once and renders once; the same bytes are hashed for the blob and sent.
+Compression and the DB write are the same in both and left out.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi.responses import JSONResponse              # noqa: E402
+from fastapi.routing import serialize_response          # noqa: E402
+from fastapi.utils import create_model_field            # noqa: E402
+
+from app.main import _render, _validate, _with_output   # noqa: E402
+from app.schemas import AgentResponse                   # noqa: E402
+
+_FIELD = create_model_field("Response_plan", AgentResponse, mode="serialization")
+_LOOP = asyncio.new_event_loop()
+
+def _card(i: int) -> dict:
+    return {"title": f"Place {i} café", "address": f"{i} Main St, Austin, TX", "geo": (30.26 + i * 1e-4, -97.74),
+            "price_tier": "$$", "duration_minutes": 90, "tags": ["museum", "art"],
+            "wheelchair_friendly": True, "child_friendly": i % 2 == 0}
+
+def _plan(days: int) -> dict:
+    return {
+        "itinerary": [{"date": (date(2026, 6, 1) + timedelta(days=d)).isoformat(),
+                       "blocks": {part: [_card(d * 9 + p * 3 + k) for k in range(3)]
+                                  for p, part in enumerate(("morning", "afternoon", "evening"))}}
+                      for d in range(days)],
+        "restaurants": [{"title": f"Restaurant {i}", "address": "Congress Ave", "geo": (30.27, -97.74),
+                         "price_tier": "$$", "tags": ["vegan", "cafe"]} for i in range(8)],
+        "packing_checklist": ["Comfortable walking shoes", "Reusable water bottle", "Light jacket"],
+        "weather_summary": "Mostly sunny, highs 28–33°C.",
+        "notes": "Auto-fetched within 5.0–15.0km of Austin, TX (OSM).",
+    }
+
+def _before(output: dict) -> bytes:
+    result = _validate(output)
+    payload = result.model_dump(mode="json")
+    hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                              default=str).encode()).hexdigest()
+    response = AgentResponse(run_id=1, output=result)
+    content = _LOOP.run_until_complete(serialize_response(field=_FIELD, response_content=response))
+    return JSONResponse(content).body
+
+def _after(output: dict) -> bytes:
+    raw = _render(_validate(output))
+    hashlib.sha256(raw).hexdigest()
+    return _with_output({"run_id": 1}, raw)
+
+def _best_ms(fn, output: dict, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(output)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, nargs="+", default=[3, 7, 30])
+    ap.add_argument("--repeats", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"{'days':>5} {'kB':>6} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+    for days in args.days:
+        output = _plan(days)
+        assert json.loads(_before(output)) == json.loads(_after(output))
+        before, after = _best_ms(_before, output, args.repeats), _best_ms(_after, output, args.repeats)
+        print(f"{days:>5} {len(_after(output)) / 1024:>6.1f} {before:>10.2f} {after:>9.2f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Local stand-ins for Open-Meteo, Overpass, Tavily and OpenAI, replaying fixtures/.
+
+    python -m benchmarks.stubs --port 9100 --latency overpass=900 tavily=600 --errors overpass=0.1
+
+Each upstream answers from its fixture (same JSON shape as the real API)
+after a log-normal delay around its median latency, and fails with its
+``--errors`` probability (429 for Overpass, 503 for the rest). Responses are
+adapted to the request so the service's caches see distinct keys: unknown
+city names geocode to a stable point derived from the name, forecasts cover
+the requested dates, and Overpass elements are re-centred on the query
+(and repeated up to ``--elements``). Replace a fixture file with a recorded
+response to replay real data.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FIXTURES = Path(__file__).parent / "fixtures"
+UPSTREAMS = ("geocode", "weather", "overpass", "tavily", "openai")
+LATENCY_MS = {"geocode": 40, "weather": 80, "overpass": 900, "tavily": 600, "openai": 700}
+JITTER = 0.35  # sigma of the log-normal delay
+
+_AROUND = re.compile(r"around:(\d+),(-?[\d.]+),(-?[\d.]+)")
+
+def _load(name: str) -> dict:
+    return json.loads((FIXTURES / f"{name}.json").read_text())
+
+def _stable(text: str) -> random.Random:
+    return random.Random(hashlib.sha1(text.encode()).digest())
+
+def make_app(latency_ms: Dict[str, float] | None = None, errors: Dict[str, float] | None = None,
+             elements: int = 0, seed: int = 0) -> FastAPI:
+    latency = {**LATENCY_MS, **(latency_ms or {})}
+    errors = errors or {}
+    rng = random.Random(seed)
+    geocode, forecast, overpass, tavily, openai = (_load(n) for n in ("geocode", "forecast", "overpass", "tavily", "openai"))
+    known = {r["name"].lower(): r for r in geocode["results"]}
+    places = overpass["elements"]
+    pts = [(e.get("lat") or e["center"]["lat"], e.get("lon") or e["center"]["lon"]) for e in places]
+    origin = (sum(p[0] for p in pts) / len(pts), sum(p[1] for p in pts) / len(pts))
+    stats = {u: {"requests": 0, "errors": 0} for u in UPSTREAMS}
+    app = FastAPI(title="upstream stubs")
+
+    async def upstream(name: str):
+        """Delay, then None or the error response to send instead."""
+        stats[name]["requests"] += 1
+        await asyncio.sleep(latency[name] / 1000 * math.exp(rng.gauss(0, JITTER)) if latency[name] else 0)
+        if rng.random() < errors.get(name, 0.0):
+            stats[name]["errors"] += 1
+            return JSONResponse({"error": "injected"}, status_code=429 if name == "overpass" else 503)
+        return None
+
+    @app.get("/geocode")
+    async def geocode_search(name: str, count: int = 1):
+        if (err := await upstream("geocode")) is not None:
+            return err
+        hit = known.get(name.split(",")[0].strip().lower())
+        if hit is None:
+            # somewhere stable near one of the known cities, so new names mean new places
+            r = _stable(name)
+            base = r.choice(geocode["results"])
+            hit = {**base, "name": name, "latitude": round(base["latitude"] + r.uniform(-1, 1), 5),
+                   "longitude": round(base["longitude"] + r.uniform(-1, 1), 5)}
+        return {"results": [hit][:count], "generationtime_ms": 0.5}
+
+    @app.get("/forecast")
+    async def forecast_daily(latitude: float, longitude: float, start_date: date, end_date: date):
+        if (err := await upstream("weather")) is not None:
+            return err
+        src = forecast["daily"]
+        n = (end_date - start_date).days + 1
+        daily = {"time": [(start_date + timedelta(days=i)).isoformat() for i in range(n)]}
+        for key, values in src.items():
+            if key != "time":
+                daily[key] = [values[i % len(values)] for i in range(n)]
+        return {**forecast, "latitude": latitude, "longitude": longitude, "daily": daily}
+
+    @app.post("/overpass")
+    async def overpass_interpreter(request: Request):
+        if (err := await upstream("overpass")) is not None:
+            return err
+        ql = parse_qs((await request.body()).decode()).get("data", [""])[0]
+        m = _AROUND.search(ql)
+        if not m:
+            return JSONResponse({"remark": "stub only answers around: queries"}, status_code=400)
+        radius_m, lat, lon = float(m[1]), float(m[2]), float(m[3])
+        out = []
+        total = max(elements, len(places))
+        r = _stable(f"{lat:.4f},{lon:.4f}")
+        for i in range(total):
+            e, (la, lo) = places[i % len(places)], pts[i % len(pts)]
+            dla, dlo = la - origin[0], lo - origin[1]
+            if i >= len(places):
+                dla, dlo = dla + r.gauss(0, 0.01), dlo + r.gauss(0, 0.012)
+            if math.hypot(dla * 111_000, dlo * 111_000 * math.cos(math.radians(lat))) > radius_m:
+                continue
+            tags = dict(e.get("tags") or {})
+            if i >= len(places) and "name" in tags:
+                tags["name"] = f"{tags['name']} #{i // len(places)}"
+            at = {"lat": round(lat + dla, 7), "lon": round(lon + dlo, 7)}
+            out.append({"type": e["type"], "id": e["id"] + i * 100_000, "tags": tags,
+                        **({"center": at} if "center" in e else at)})
+        return {**{k: v for k, v in overpass.items() if k != "elements"}, "elements": out}
+
+    @app.post("/tavily/search")
+    async def tavily_search(request: Request):
+        if (err := await upstream("tavily")) is not None:
+            return err
+        body = await request.json()
+        return {**tavily, "query": body.get("query", ""), "results": tavily["results"][: body.get("max_results", 5)]}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions():
+        if (err := await upstream("openai")) is not None:
+            return err
+        return openai
+
+    @app.get("/stats")
+    def upstream_stats():
+        return stats
+
+    return app
+
+def env_for(base_url: str) -> Dict[str, str]:
+    """Environment pointing the service at stubs served from ``base_url``."""
+    return {
+        "GEOCODE_URL": f"{base_url}/geocode",
+        "FORECAST_URL": f"{base_url}/forecast",
+        "OVERPASS_URL": f"{base_url}/overpass",
+        "OVERPASS_FALLBACK_URLS": "",
+        "TAVILY_URL": f"{base_url}/tavily/search",
+        "TAVILY_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{base_url}/openai/v1",
+        "OPENAI_API_KEY": "stub",
+    }
+
+def parse_pairs(pairs, cast=float) -> Dict[str, float]:
+    """["overpass=900", ...] -> {"overpass": 900.0}"""
+    out = {}
+    for p in pairs or []:
+        name, _, value = p.partition("=")
+        if name not in UPSTREAMS:
+            raise SystemExit(f"unknown upstream {name!r}; expected one of {', '.join(UPSTREAMS)}")
+        out[name] = cast(value)
+    return out
+
+def main(argv: list[str] | None = None):
+    import uvicorn
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--latency", nargs="*", metavar="UPSTREAM=MS", help="median latency per upstream")
+    ap.add_argument("--errors", nargs="*", metavar="UPSTREAM=RATE", help="failure probability per upstream")
+    ap.add_argument("--elements", type=int, default=0, help="repeat Overpass fixture elements up to N")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    app = make_app(parse_pairs(args.latency), parse_pairs(args.errors), args.elements, args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()